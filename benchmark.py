@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+離線效能評測 Offline Benchmark
+以本機替身伺服器評測PDF爬蟲與資料流程在不同worker數下的吞吐量、延遲分位數與記憶體峰值，結果累積保存以便比較
+"""
+
+import io
+import os
+import json
+import math
+import time
+import sqlite3
+import argparse
+import logging
+import tempfile
+import threading
+import contextlib
+import subprocess
+
+from mops_stub import MopsStub
+from mops_api import MopsClient
+from rdb_loader import RDBLoader
+from sync_state import IncrementalSync
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULTS_PATH = "bench_results.jsonl"
+PIPELINES = ("data", "pdf")
+
+
+def _children(pid):
+    """
+    所有子孫程序（Linux /proc） Descendant PIDs from /proc
+    """
+    parents = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as file:
+                # comm可能含空白，ppid在最後一個右括號之後 comm may contain spaces; ppid follows the last ')'
+                ppid = int(file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(name))
+    found, stack = [], [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _rss(pid):
+    """
+    程序常駐記憶體（bytes） Resident set size of one process, in bytes
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class RssSampler:
+    """
+    記憶體峰值取樣 Peak RSS sampler
+    背景執行緒定期加總本程序與所有子孫程序（含Chrome）的RSS Periodically sums RSS of this process tree, Chrome included
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        pid = os.getpid()
+        try:
+            import psutil
+            process = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except ImportError:
+            return sum(_rss(p) for p in [pid] + _children(pid))
+        except Exception:
+            return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._sample())
+
+
+def percentile(values, q):
+    """
+    最近秩分位數 Nearest-rank percentile
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(round(q * len(ordered), 9)) - 1))
+    return ordered[index]
+
+
+def bench_data(stub, company_ids, workers, load_every=100):
+    """
+    評測資料流程：與 stock_data_crawler 相同的 fetch_many → IncrementalSync → RDBLoader
+    Benchmark the stock_data_crawler pipeline: fetch_many -> IncrementalSync -> RDBLoader
+
+    Returns:
+        dict: 各公司延遲（請求加增量比對）與錯誤數 Per-company latency (fetch plus sync apply) and error count
+    """
+    from stock_data_crawler import sync_stocks
+
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as workdir:
+        client = MopsClient(base_url=stub.api_url, max_connections=workers, backoff=0.05)
+        sync = IncrementalSync(os.path.join(workdir, "sync_state.sqlite3"))
+        connection = sqlite3.connect(os.path.join(workdir, "stock_data.db"))
+        loader = RDBLoader(connection, batch_size=1000, create_tables=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            errors = sync_stocks(client, sync, [loader], company_ids, workers=workers, load_every=load_every)
+        connection.close()
+        client.close()
+    companies = METRICS.summary()["companies"]
+    latencies = [sum(companies[company_id].values()) for company_id in company_ids if company_id in companies]
+    return {"latencies": latencies, "errors": errors}
+
+
+def bench_pdf(stub, company_ids, workers, backend="selenium", profile="lean", parallel_sections=False):
+    """
+    評測PDF爬蟲 Benchmark StockPDFCrawler through the scheduler
+
+    Returns:
+        dict: 各公司延遲列表與錯誤數 Per-company latencies and error count
+    """
+    from crawl_scheduler import CrawlScheduler
+
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as workdir:
+        scheduler = CrawlScheduler(workers=workers, requests_per_second=1000, burst=workers,
+                                   download_path=os.path.join(workdir, "pdfs"), site_url=stub.url,
+                                   company_cache_path=os.path.join(workdir, "company_ids.sqlite3"),
+                                   backend=backend, profile=profile, parallel_sections=parallel_sections)
+        results = scheduler.run(company_ids)
+    companies = METRICS.summary()["companies"]
+    latencies = [companies[company_id]["company"] for company_id in company_ids
+                 if "company" in companies.get(company_id, {})]
+    return {"latencies": latencies, "errors": sum(1 for ok in results.values() if not ok)}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(pipelines=PIPELINES, worker_counts=(1, 2, 4), companies=50, latency=0.05, jitter=0.0,
+                  error_rate=0.0, throttle_rate=0.0, results_path=DEFAULT_RESULTS_PATH, **pdf_kwargs):
+    """
+    執行評測並保存結果 Run the benchmark matrix and append results
+
+    Args:
+        pipelines (tuple): "data" 與/或 "pdf"
+        worker_counts (tuple): 要評測的worker數 Worker counts to measure
+        companies (int): 每次評測的公司數 Companies per measurement
+        latency, jitter, error_rate, throttle_rate: 替身伺服器設定 Stand-in server settings
+        results_path (str): 結果檔（JSON Lines） Results file, JSON Lines
+        pdf_kwargs: bench_pdf 參數 backend / profile / parallel_sections
+
+    Returns:
+        list: 本次各組結果 Result rows of this run
+    """
+    company_ids = [str(1000 + index) for index in range(companies)]
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    revision = _git_revision()
+    rows = []
+    with MopsStub(latency=latency, jitter=jitter, error_rate=error_rate, throttle_rate=throttle_rate,
+                  seed=0) as stub:
+        for pipeline in pipelines:
+            for workers in worker_counts:
+                logger.info("Benchmark %s with %d workers", pipeline, workers)
+                start = time.perf_counter()
+                with RssSampler() as sampler:
+                    if pipeline == "data":
+                        outcome = bench_data(stub, company_ids, workers)
+                    else:
+                        outcome = bench_pdf(stub, company_ids, workers, **pdf_kwargs)
+                elapsed = time.perf_counter() - start
+                latencies = outcome["latencies"]
+                rows.append({
+                    "run_id": run_id,
+                    "revision": revision,
+                    "pipeline": pipeline,
+                    "workers": workers,
+                    "companies": companies,
+                    "errors": outcome["errors"],
+                    "seconds": round(elapsed, 3),
+                    "companies_per_sec": round(companies / elapsed, 3) if elapsed else None,
+                    "p50": round(percentile(latencies, 0.50), 4) if latencies else None,
+                    "p99": round(percentile(latencies, 0.99), 4) if latencies else None,
+                    "peak_rss_mb": round(sampler.peak / 1024 / 1024, 1),
+                    "server": {"latency": latency, "jitter": jitter, "error_rate": error_rate,
+                               "throttle_rate": throttle_rate},
+                    "options": pdf_kwargs if pipeline == "pdf" else {},
+                })
+    with open(results_path, "a", encoding="utf-8") as file:
+        for row in rows:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return rows
+
+
+def load_results(results_path=DEFAULT_RESULTS_PATH):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare(rows, results_path=DEFAULT_RESULTS_PATH):
+    """
+    與同設定的上一次結果比較 Compare with the previous run of the same pipeline and worker count
+
+    Returns:
+        list: 文字報表各行 Report lines
+    """
+    history = [row for row in load_results(results_path) if row["run_id"] != rows[0]["run_id"]] if rows else []
+    lines = [f"{'pipeline':8} {'workers':>7} {'co/s':>8} {'Δco/s':>8} {'p50':>8} {'p99':>8} {'RSS MB':>8} {'errors':>6}"]
+    for row in rows:
+        previous = [old for old in history if old["pipeline"] == row["pipeline"] and old["workers"] == row["workers"]
+                    and old.get("options") == row.get("options") and old.get("server") == row.get("server")]
+        delta = ""
+        if previous and previous[-1]["companies_per_sec"] and row["companies_per_sec"]:
+            delta = f"{(row['companies_per_sec'] / previous[-1]['companies_per_sec'] - 1) * 100:+.1f}%"
+        lines.append(f"{row['pipeline']:8} {row['workers']:>7} {row['companies_per_sec'] or 0:>8.2f} {delta:>8} "
+                     f"{row['p50'] or 0:>8.3f} {row['p99'] or 0:>8.3f} {row['peak_rss_mb']:>8.1f} {row['errors']:>6}")
+    return lines
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="離線效能評測 Offline benchmark")
+    parser.add_argument("--pipeline", nargs="+", choices=PIPELINES, default=["data"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--backend", choices=("selenium", "api"), default="selenium")
+    parser.add_argument("--profile", choices=("full", "lean"), default="lean")
+    parser.add_argument("--parallel-sections", action="store_true")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.pipeline, args.workers, args.companies, args.latency, args.jitter, args.error_rate,
+                            args.throttle_rate, args.results, backend=args.backend, profile=args.profile,
+                            parallel_sections=args.parallel_sections)
+    print("\n".join(compare(results, args.results)))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+股票代碼預先驗證 Company ID Pre-validation
+啟動瀏覽器前先以JSON API確認代碼有效，結果連同有效期存於SQLite，已知無效的代碼不再佔用瀏覽器
+"""
+
+import os
+import time
+import logging
+
+from mops_api import MopsClient, InvalidCompanyError
+from db_utils import sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".stock_crawler", "company_ids.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS company_ids (
+    company_id  TEXT PRIMARY KEY,
+    valid       INTEGER NOT NULL,
+    checked_at  REAL NOT NULL
+)
+"""
+
+
+class CompanyValidator:
+    """
+    代碼驗證器 Company ID validator
+    有效與無效結果各有有效期；API暫時失敗時視為有效，交由後續流程處理且不寫入快取
+    Valid and invalid results expire separately; transient API errors count as valid and are not cached
+    """
+
+    def __init__(self, client=None, cache_path=None, negative_ttl=7 * 86400, positive_ttl=86400):
+        """
+        初始化驗證器 Initialize validator
+
+        Args:
+            client (MopsClient): API用戶端 API client
+            cache_path (str): 快取資料庫路徑 Cache database path
+            negative_ttl (float): 無效代碼快取秒數 Seconds a known-bad ID stays cached
+            positive_ttl (float): 有效代碼快取秒數 Seconds a known-good ID stays cached
+        """
+        self.client = client or MopsClient()
+        self.cache_path = cache_path or DEFAULT_CACHE_PATH
+        self.negative_ttl = negative_ttl
+        self.positive_ttl = positive_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with sqlite_connection(self.cache_path) as conn:
+            conn.execute(SCHEMA)
+
+    def is_valid(self, company_id):
+        """
+        代碼是否有效 Whether a company ID is valid
+        快取未命中或過期時查詢API Queries the API on a cache miss or expired entry
+        """
+        return self.check(company_id)[0]
+
+    def check(self, company_id):
+        """
+        驗證代碼並交回查詢到的資料，呼叫端不必再請求一次
+        Validate an ID and hand back the payload fetched for it, so callers need not request it again
+
+        Returns:
+            tuple: (是否有效 valid, t146sb05 result；快取命中或查詢失敗時為None None on a cache hit or error)
+        """
+        cached = self.cached(company_id)
+        if cached is not None:
+            return cached, None
+        try:
+            info = self.client.fetch_company_info(company_id)
+        except InvalidCompanyError:
+            logger.warning("Invalid company_id %s, cached for %.0f days", company_id, self.negative_ttl / 86400)
+            self.remember(company_id, False)
+            return False, None
+        except Exception as e:
+            logger.warning("Could not validate company_id %s: %s", company_id, str(e))
+            return True, None
+        self.remember(company_id, True)
+        return True, info
+
+    def cached(self, company_id):
+        """
+        快取中未過期的結果 Unexpired cached result
+
+        Returns:
+            bool or None: 未知則None None when unknown or expired
+        """
+        with sqlite_connection(self.cache_path) as conn:
+            row = conn.execute("SELECT valid, checked_at FROM company_ids WHERE company_id = ?",
+                               (company_id,)).fetchone()
+        if row is None:
+            return None
+        valid, checked_at = bool(row[0]), row[1]
+        ttl = self.positive_ttl if valid else self.negative_ttl
+        return valid if time.time() - checked_at < ttl else None
+
+    def known_invalid(self, company_ids):
+        """
+        只查快取，找出已知無效的代碼 Known-bad IDs from the cache alone, no requests
+
+        Returns:
+            set: 已知無效的股票代碼
+        """
+        return {company_id for company_id in company_ids if self.cached(company_id) is False}
+
+    def remember(self, company_id, valid):
+        """
+        記錄單一代碼結果 Record one result
+        """
+        self.remember_many([company_id], valid)
+
+    def remember_many(self, company_ids, valid):
+        """
+        批次記錄結果，例如由上市櫃公司清單匯入 Record many results, e.g. from a listed-company list
+        """
+        now = time.time()
+        with sqlite_connection(self.cache_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO company_ids (company_id, valid, checked_at) VALUES (?, ?, ?)",
+                [(company_id, int(valid), now) for company_id in company_ids],
+            )
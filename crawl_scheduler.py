@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多程序爬取排程器 Parallel Crawl Scheduler
+以多個瀏覽器worker程序平行爬取多家公司，共用一個全域請求速率限制
+可搭配JobJournal記錄進度，中斷後只續跑未完成的公司與欄位
+"""
+
+import queue
+import multiprocessing
+import logging
+
+from rate_limiter import RateLimiter, AdaptiveRateLimiter
+from company_validator import CompanyValidator
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def _crawl_one(crawler, company_id, sections):
+    """
+    爬取一家公司並整理各欄位結果 Crawl one company and collect per-section results
+
+    Returns:
+        tuple: (success, section_results, error)
+    """
+    error = None
+    try:
+        success = crawler.crawl_stock_pdf(company_id, only_sections=sections)
+    except Exception as e:
+        logger.error("Crawl failed on company_id %s: %s", company_id, str(e))
+        success, error = False, str(e)
+    section_results = dict(crawler.last_section_results)
+    if sections is not None:
+        for section in sections:
+            section_results.setdefault(section, False)
+    if not success and error is None:
+        error = "crawl failed"
+    return success, section_results, error
+
+
+def _crawl_worker(worker_id, task_queue, result_queue, rate_limiter, crawler_kwargs):
+    """
+    worker程序主迴圈 Worker process loop
+    每個worker持有自己的爬蟲與瀏覽器，取到None時結束
+
+    Args:
+        worker_id (int): worker編號
+        task_queue: 待爬佇列 Queue of (company_id, sections)
+        result_queue: 結果佇列 Queue of ("start", company_id, sections),
+                      ("done", company_id, success, section_results, error) and ("metrics", snapshot)
+        rate_limiter: 全域共用的RateLimiter
+        crawler_kwargs (dict): StockPDFCrawler參數
+    """
+    # 在子程序中匯入，避免主程序載入selenium Import in the child so the parent stays light
+    from stock_pdf_crawler import StockPDFCrawler
+
+    # fork時會複製主程序已累積的指標 A forked child inherits the parent's metrics so far
+    METRICS.reset()
+    crawler = StockPDFCrawler(rate_limiter=rate_limiter, **crawler_kwargs)
+    logger.info("Worker %d started", worker_id)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            company_id, sections = task
+            result_queue.put(("start", company_id, sections))
+            result_queue.put(("done", company_id) + _crawl_one(crawler, company_id, sections))
+    finally:
+        crawler.close()
+        # 結束前回傳本程序的指標供主程序合併 Hand this process's metrics to the parent
+        result_queue.put(("metrics", METRICS.snapshot()))
+        logger.info("Worker %d stopped", worker_id)
+
+
+class CrawlScheduler:
+    """
+    爬取排程器 Crawl scheduler
+    將股票代碼分派給N個worker程序，所有worker共用同一個速率限制器
+    """
+
+    def __init__(self, workers=1, requests_per_second=1.0, burst=1, max_requests_per_second=None, **crawler_kwargs):
+        """
+        初始化排程器 Initialize scheduler
+
+        Args:
+            workers (int): worker程序數量，1表示在目前程序執行 Worker processes, 1 runs in-process
+            requests_per_second (float): 全域請求速率上限 Global request rate cap for mops.twse.com.tw
+            burst (int): 速率限制可累積的令牌數 Token bucket burst size
+            max_requests_per_second (float): 設定後改用自適應限制，由requests_per_second起步最高到此值
+                                             Enables the adaptive limiter, starting at requests_per_second
+            crawler_kwargs: 傳給StockPDFCrawler的參數 Keyword arguments for StockPDFCrawler
+        """
+        self.workers = max(1, workers)
+        self.crawler_kwargs = crawler_kwargs
+        self._context = multiprocessing.get_context()
+        if max_requests_per_second:
+            self.rate_limiter = AdaptiveRateLimiter(requests_per_second, burst=burst, context=self._context,
+                                                    max_rate=max_requests_per_second)
+        else:
+            self.rate_limiter = RateLimiter(requests_per_second, burst=burst, context=self._context)
+        # 分派前只查快取剔除已知無效代碼 Drop known-bad IDs from the cache alone before dispatch
+        self.validator = None
+        if crawler_kwargs.get("validate_ids", True):
+            self.validator = CompanyValidator(cache_path=crawler_kwargs.get("company_cache_path"))
+
+    def run(self, company_ids, journal=None, retry_failed_only=False):
+        """
+        執行爬取 Run crawl
+
+        Args:
+            company_ids (list): 股票代碼列表 List of stock company IDs
+            journal (JobJournal): 工作日誌，設定後只執行未完成的欄位 Job journal; only unfinished sections run
+            retry_failed_only (bool): 只重試日誌中失敗的欄位 Only retry sections the journal marked failed
+
+        Returns:
+            dict: 股票代碼對應是否成功，順序與輸入相同 company_id -> success, in input order
+                  有日誌時為全部欄位是否完成 With a journal, whether every section is done
+        """
+        company_ids = list(dict.fromkeys(company_ids))
+        invalid = self.validator.known_invalid(company_ids) if self.validator else set()
+        if invalid:
+            logger.info("Skipping %d known invalid company IDs: %s", len(invalid), ", ".join(sorted(invalid)))
+        if journal is None:
+            tasks = [(company_id, None) for company_id in company_ids if company_id not in invalid]
+        else:
+            journal.enqueue(company_ids)
+            tasks = []
+            for company_id, sections in journal.unfinished(company_ids, retry_failed_only).items():
+                if company_id in invalid:
+                    journal.finish(company_id, {section: False for section in sections}, "invalid company id")
+                else:
+                    tasks.append((company_id, sections))
+            logger.info("Job %s: %d of %d companies to crawl", journal.job_id, len(tasks), len(company_ids))
+
+        if self.workers == 1 or len(tasks) <= 1:
+            finished = self._run_inline(tasks, journal)
+        else:
+            finished = self._run_workers(tasks, journal)
+
+        if journal is not None:
+            return journal.company_status(company_ids)
+        return {company_id: finished.get(company_id, False) for company_id in company_ids}
+
+    def _run_workers(self, tasks, journal=None):
+        """
+        分派給多個worker程序 Fan tasks out to worker processes
+        """
+        task_queue = self._context.Queue()
+        result_queue = self._context.Queue()
+        for task in tasks:
+            task_queue.put(task)
+
+        worker_count = min(self.workers, len(tasks))
+        processes = []
+        for worker_id in range(1, worker_count + 1):
+            task_queue.put(None)
+            process = self._context.Process(
+                target=_crawl_worker,
+                args=(worker_id, task_queue, result_queue, self.rate_limiter, self.crawler_kwargs),
+                daemon=True,
+            )
+            process.start()
+            processes.append(process)
+
+        finished = {}
+        reported = 0
+        while len(finished) < len(tasks) or reported < len(processes):
+            try:
+                message = result_queue.get(timeout=5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    if len(finished) < len(tasks):
+                        logger.error("All workers exited with %d companies unfinished",
+                                     len(tasks) - len(finished))
+                    break
+                continue
+            if message[0] == "metrics":
+                METRICS.merge(message[1])
+                reported += 1
+                continue
+            if message[0] == "start":
+                if journal is not None:
+                    journal.start(message[1], message[2] or journal.sections)
+                continue
+            _, company_id, success, section_results, error = message
+            finished[company_id] = success
+            if journal is not None:
+                journal.finish(company_id, section_results, error)
+
+        for process in processes:
+            process.join(timeout=30)
+
+        return finished
+
+    def _run_inline(self, tasks, journal=None):
+        """
+        單一worker時直接在目前程序執行 Run in the current process for a single worker
+        """
+        from stock_pdf_crawler import StockPDFCrawler
+
+        results = {}
+        if not tasks:
+            return results
+        with StockPDFCrawler(rate_limiter=self.rate_limiter, **self.crawler_kwargs) as crawler:
+            for company_id, sections in tasks:
+                if journal is not None:
+                    journal.start(company_id, sections or journal.sections)
+                success, section_results, error = _crawl_one(crawler, company_id, sections)
+                results[company_id] = success
+                if journal is not None:
+                    journal.finish(company_id, section_results, error)
+        return results
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐爬取服務 Long-running Crawl Service
+本機HTTP工作API接收「產生PDF／同步資料」請求，由常駐worker依優先序處理：
+瀏覽器、連線池與pandas只在啟動時載入一次，臨時的單一股票請求可插隊到夜間批次之前
+Local HTTP job API in front of warm workers and a priority queue; browsers, connection pools
+and pandas load once, and ad-hoc single-ticker requests jump ahead of the nightly bulk run
+"""
+
+import os
+import json
+import math
+import time
+import queue
+import sqlite3
+import logging
+import itertools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from metrics import METRICS
+from rate_limiter import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 工作種類 Job kinds
+KINDS = ("pdf", "data")
+
+# 優先序，數字小者先執行 Priorities, lower runs first
+PRIORITIES = {"high": 0, "normal": 10, "bulk": 20}
+
+# 工作狀態 Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# 通知worker結束的佇列項目，排在所有工作之前 Stop marker, sorts ahead of every real task
+_STOP = (float("-inf"), 0, None, None)
+
+
+class CrawlService:
+    """
+    爬取服務 Crawl service
+    每種工作各有一個優先佇列；每家公司是一個佇列項目，所以高優先工作不必等整個批次結束
+    One priority queue per kind with one item per company, so a high-priority job never waits for a whole batch.
+    工作狀態只保存在記憶體，需要續跑的大型批次請用 run_crawler.py 的工作日誌
+    Job state lives in memory; use the run_crawler.py job journal for resumable bulk runs
+    """
+
+    def __init__(self, pdf_workers=1, data_workers=2, download_path="./pdfs", db_path="stock_data.db",
+                 parquet_dir=None, sync_path="sync_state.sqlite3", cache_path="mops_cache.sqlite3",
+                 full_refresh=False, requests_per_second=2.0, max_requests_per_second=10.0, site_url=None,
+                 **crawler_kwargs):
+        """
+        初始化服務 Initialize service
+
+        Args:
+            pdf_workers (int): 常駐瀏覽器worker數 Warm browser workers
+            data_workers (int): 資料同步worker數 Data sync workers
+            download_path (str): PDF輸出目錄 PDF output directory
+            db_path (str): SQLite資料庫檔 SQLite database for the data pipeline
+            parquet_dir (str): 設定則另外匯出Parquet資料集 Also export Parquet datasets when set
+            sync_path (str): 增量同步水位檔 Incremental sync watermarks
+            cache_path (str): API回應快取檔，None則不快取 MOPS response cache, disabled if None
+            full_refresh (bool): 忽略水位重新載入全部 Ignore watermarks and reload everything
+            requests_per_second (float): 起始請求速率，所有worker共用 Starting request rate shared by all workers
+            max_requests_per_second (float): 自適應速率上限 Adaptive rate ceiling
+            site_url (str): 網站根網址，None為正式站 Site root, the real site if None
+            crawler_kwargs: 其他StockPDFCrawler參數 Other StockPDFCrawler arguments
+        """
+        self.pdf_workers = pdf_workers
+        self.data_workers = data_workers
+        self.download_path = download_path
+        self.db_path = db_path
+        self.parquet_dir = parquet_dir
+        self.sync_path = sync_path
+        self.cache_path = cache_path
+        self.full_refresh = full_refresh
+        self.site_url = site_url
+        self.crawler_kwargs = crawler_kwargs
+        self.rate_limiter = AdaptiveRateLimiter(requests_per_second, burst=max(1, pdf_workers + data_workers),
+                                                max_rate=max_requests_per_second)
+        self.queues = {kind: queue.PriorityQueue() for kind in KINDS}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._threads = []
+        self._client = None
+        self._sync = None
+
+    def start(self):
+        """
+        啟動常駐worker Start the warm workers
+        """
+        counts = {"pdf": self.pdf_workers, "data": self.data_workers}
+        for kind in KINDS:
+            for index in range(counts[kind]):
+                thread = threading.Thread(target=self._worker, args=(kind,), name=f"{kind}-worker-{index + 1}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info("Crawl service started with %d PDF and %d data workers", self.pdf_workers, self.data_workers)
+        return self
+
+    def stop(self):
+        """
+        等目前的公司處理完後停止worker，尚未開始的公司標記為取消
+        Stop workers after the company each is working on; companies still queued are cancelled
+        """
+        for thread in self._threads:
+            self.queues[thread.name.split("-", 1)[0]].put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._cancel_queued()
+        if self._client is not None:
+            self._client.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def submit(self, kind, company_ids, priority="normal"):
+        """
+        提交工作 Submit a job
+
+        Args:
+            kind (str): "pdf" 或 "data"
+            company_ids (list): 股票代碼 Stock company IDs
+            priority (str or int): high / normal / bulk 或數字 or a number, lower runs first
+
+        Returns:
+            dict: 工作狀態 Job status
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # 只接受名稱或有限數字 Only a priority name or a finite number
+        if not isinstance(priority, (str, int, float)) or isinstance(priority, bool):
+            raise ValueError(f"Unknown priority: {priority}")
+        rank = PRIORITIES.get(priority, priority)
+        if isinstance(rank, str) or not math.isfinite(rank):
+            raise ValueError(f"Unknown priority: {priority}")
+        # 字串會被逐字拆開，必須是代碼列表 A bare string would be split into characters
+        if not isinstance(company_ids, (list, tuple)) or \
+                not all(isinstance(company_id, (str, int)) and not isinstance(company_id, bool)
+                        for company_id in company_ids):
+            raise ValueError("company_ids must be a list of stock IDs")
+        company_ids = list(dict.fromkeys(str(company_id).strip() for company_id in company_ids))
+        if not company_ids:
+            raise ValueError("No company IDs given")
+
+        with self._lock:
+            job_id = f"{kind}-{next(self._sequence)}"
+            job = {
+                "job_id": job_id,
+                "kind": kind,
+                "priority": rank,
+                "status": QUEUED,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "pending": len(company_ids),
+                "results": {company_id: None for company_id in company_ids},
+            }
+            self._jobs[job_id] = job
+        for company_id in company_ids:
+            self.queues[kind].put((rank, next(self._sequence), job_id, company_id))
+        logger.info("Job %s queued: %d companies at priority %s", job_id, len(company_ids), rank)
+        return self.job(job_id)
+
+    def job(self, job_id):
+        """
+        工作狀態（含各公司結果與產出路徑） Job status with per-company results and artifact paths
+
+        Returns:
+            dict or None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job is not None else None
+
+    def jobs(self):
+        """
+        所有工作摘要 Summaries of every job
+        """
+        with self._lock:
+            return [{key: job[key] for key in ("job_id", "kind", "priority", "status", "pending", "submitted_at",
+                                               "finished_at")} for job in self._jobs.values()]
+
+    def wait(self, job_id, timeout=None, interval=0.5):
+        """
+        等待工作結束 Wait until a job finishes
+
+        Returns:
+            dict: 工作狀態 Job status, possibly still running if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job is None or job["status"] in (DONE, FAILED, CANCELLED):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "queued": {kind: self.queues[kind].qsize() for kind in KINDS},
+            "workers": {"pdf": self.pdf_workers, "data": self.data_workers},
+            "rate": round(self.rate_limiter.rate, 3),
+        }
+
+    def _worker(self, kind):
+        """
+        常駐worker：爬蟲或資料庫連線只建立一次 Warm worker; the crawler or DB connection is created once
+        """
+        handle = None
+        try:
+            while True:
+                item = self.queues[kind].get()
+                if item == _STOP:
+                    break
+                _, _, job_id, company_id = item
+                self._mark_started(job_id)
+                try:
+                    if handle is None:
+                        handle = self._open_pdf() if kind == "pdf" else self._open_data()
+                    with METRICS.timer("service_task", company_id=company_id, kind=kind):
+                        result = (self._run_pdf if kind == "pdf" else self._run_data)(handle, company_id)
+                except Exception as e:
+                    logger.error("%s job %s failed for company_id %s: %s", kind, job_id, company_id, str(e))
+                    result = {"success": False, "error": str(e)}
+                self._record(job_id, company_id, result)
+        finally:
+            if handle is not None:
+                self._close(kind, handle)
+
+    def _open_pdf(self):
+        # 延遲載入selenium Selenium is imported on first use
+        from stock_pdf_crawler import StockPDFCrawler
+
+        if self.site_url:
+            self.crawler_kwargs.setdefault("site_url", self.site_url)
+        return StockPDFCrawler(download_path=self.download_path, rate_limiter=self.rate_limiter,
+                               **self.crawler_kwargs)
+
+    def _open_data(self):
+        # 延遲載入requests與pandas requests and pandas are imported on first use
+        from mops_api import MopsClient
+        from http_cache import ResponseCache
+        from rdb_loader import RDBLoader
+        from parquet_sink import ParquetSink
+        from sync_state import IncrementalSync
+
+        with self._lock:
+            # 連線池、回應快取與水位由所有資料worker共用 Pool, response cache and watermarks shared by data workers
+            if self._client is None:
+                kwargs = {"base_url": f"{self.site_url}/mops/api"} if self.site_url else {}
+                cache = ResponseCache(self.cache_path) if self.cache_path else None
+                self._client = MopsClient(max_connections=max(1, self.data_workers), rate_limiter=self.rate_limiter,
+                                          cache=cache, **kwargs)
+                self._sync = IncrementalSync(self.sync_path, full_refresh=self.full_refresh)
+        # SQLite連線不可跨執行緒，每個worker一條 SQLite connections are per thread
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        sinks = [RDBLoader(connection, batch_size=1000, create_tables=True)]
+        if self.parquet_dir:
+            sinks.append(ParquetSink(self.parquet_dir))
+        return connection, sinks
+
+    def _close(self, kind, handle):
+        if kind == "pdf":
+            handle.close()
+        else:
+            handle[0].close()
+
+    def _run_pdf(self, crawler, company_id):
+        success = crawler.crawl_stock_pdf(company_id)
+        artifacts = dict(crawler.last_pdf_paths)
+        if crawler.store:
+            # 資料未變動而跳過的欄位，回傳儲存庫中上次的PDF Sections skipped as unchanged point at the stored PDF
+            for section, ok in crawler.last_section_results.items():
+                entry = crawler.store.latest(company_id, section) if ok and section not in artifacts else None
+                if entry:
+                    artifacts[section] = crawler.store.blob_path(entry["pdf_hash"])
+        return {
+            "success": bool(success),
+            "sections": dict(crawler.last_section_results),
+            "artifacts": sorted(artifacts.values()),
+        }
+
+    def _run_data(self, handle, company_id):
+        from mops_api import InvalidCompanyError
+        from frame_builder import FrameBuilder
+
+        _, sinks = handle
+        try:
+            info, revenue_rows = self._client.fetch_company(company_id, need_revenue=self._sync.needs_revenue)
+        except InvalidCompanyError:
+            return {"success": False, "error": "invalid company id"}
+        # 增量同步：只載入新的營收月份與有變動的基本資料、財報 Only new revenue months and changed parts are loaded
+        builder = FrameBuilder()
+        added = self._sync.apply(builder, company_id, info, revenue_rows)
+        try:
+            frames = builder.frames()
+            for sink in sinks:
+                sink.load_all(*frames)
+        except Exception:
+            self._sync.discard([company_id])
+            raise
+        self._sync.commit([company_id])
+        artifacts = [os.path.abspath(self.db_path)] + ([os.path.abspath(self.parquet_dir)] if self.parquet_dir else [])
+        return {"success": True, "rows": added, "artifacts": artifacts}
+
+    def _cancel_queued(self):
+        """
+        worker停止後，佇列中剩下的公司記為取消 Record companies left in the queues as cancelled
+        """
+        for kind in KINDS:
+            while True:
+                try:
+                    item = self.queues[kind].get_nowait()
+                except queue.Empty:
+                    break
+                if item == _STOP:
+                    continue
+                _, _, job_id, company_id = item
+                self._record(job_id, company_id, {"success": False, "cancelled": True, "error": "service stopped"})
+
+    def _mark_started(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["status"] == QUEUED:
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+
+    def _record(self, job_id, company_id, result):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["results"][company_id] = result
+            job["pending"] -= 1
+            if job["pending"] == 0:
+                job["finished_at"] = time.time()
+                results = job["results"].values()
+                if all(r["success"] for r in results):
+                    job["status"] = DONE
+                else:
+                    job["status"] = CANCELLED if any(r.get("cancelled") for r in results) else FAILED
+                logger.info("Job %s %s in %.1fs", job_id, job["status"], job["finished_at"] - job["submitted_at"])
+
+
+class ServiceServer:
+    """
+    工作API Job API over HTTP, bound to localhost
+
+        POST /jobs        {"kind": "pdf"|"data", "company_ids": [...], "priority": "high"|"normal"|"bulk"}
+        GET  /jobs        所有工作 Every job
+        GET  /jobs/<id>   工作狀態與產出 Job status and artifacts
+        GET  /health      佇列長度與目前速率 Queue depth and current rate
+        GET  /metrics     Prometheus文字格式 Prometheus text format
+    """
+
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.service = service
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        logger.info("Crawl service API listening on %s", self.url)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        service = self.service
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+            def _send(self, status, body, content_type="application/json; charset=utf-8"):
+                if not isinstance(body, str):
+                    body = json.dumps(body, ensure_ascii=False)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if path == "/health":
+                    self._send(200, service.health())
+                elif path == "/metrics":
+                    self._send(200, METRICS.to_prometheus(), "text/plain; version=0.0.4")
+                elif path == "/jobs":
+                    self._send(200, service.jobs())
+                elif path.startswith("/jobs/"):
+                    job = service.job(path[len("/jobs/"):])
+                    self._send(200, job) if job else self._send(404, {"error": "job not found"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+                    self._send(404, {"error": "not found"})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(payload, dict):
+                        raise ValueError("Request body must be a JSON object")
+                    job = service.submit(payload.get("kind", "pdf"), payload.get("company_ids") or [],
+                                         payload.get("priority", "normal"))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                self._send(202, job)
+
+        return Handler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **service_kwargs):
+    """
+    啟動服務直到中斷 Run the service until interrupted
+
+    Args:
+        host (str): 綁定位址，預設只接受本機連線 Bind address, localhost only by default
+        port (int): 連接埠 Port
+        service_kwargs: CrawlService 參數
+    """
+    service = CrawlService(**service_kwargs).start()
+    server = ServiceServer(service, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        service.stop()
+        METRICS.export("metrics", "crawl_service")
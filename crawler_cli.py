@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬蟲命令列 Crawler CLI
+頂層只載入標準函式庫，selenium、requests、pandas 等到子命令真正需要時才載入
+Only the standard library is imported up front; selenium, requests and pandas load when a subcommand needs them
+
+    python crawler_cli.py serve --pdf-workers 2           啟動常駐服務 Start the service
+    python crawler_cli.py submit pdf 2330 --priority high  交給服務處理 Hand a job to the service
+    python crawler_cli.py status pdf-1                     查詢工作 Job status
+    python crawler_cli.py pdf 2330 2454                    不經服務直接執行 One-shot, no service
+    python crawler_cli.py data 2330
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+import urllib.error
+import urllib.request
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+def _request(url, payload=None):
+    """
+    呼叫服務API Call the service API
+    """
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"},
+                                     method="POST" if data is not None else "GET")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read().decode("utf-8") or "{}")
+    except urllib.error.URLError as e:
+        return {"error": f"服務未啟動 Service not reachable at {url}: {e.reason}"}
+
+
+def _print(body):
+    print(json.dumps(body, ensure_ascii=False, indent=2))
+
+
+def cmd_serve(args):
+    from crawl_service import serve
+
+    serve(args.host, args.port, pdf_workers=args.pdf_workers, data_workers=args.data_workers,
+          download_path=args.download_path, db_path=args.db, parquet_dir=args.parquet_dir,
+          full_refresh=args.full_refresh, site_url=args.site_url, backend=args.backend, profile=args.profile,
+          store_path=args.store_path)
+
+
+def cmd_submit(args):
+    body = _request(f"{args.url}/jobs", {"kind": args.kind, "company_ids": args.company_ids,
+                                         "priority": args.priority})
+    if args.wait and "job_id" in body:
+        while body.get("status") not in ("done", "failed", "cancelled"):
+            time.sleep(1)
+            body = _request(f"{args.url}/jobs/{body['job_id']}")
+    _print(body)
+    return body.get("status") != "failed" and "error" not in body
+
+
+def cmd_status(args):
+    body = _request(f"{args.url}/jobs/{args.job_id}" if args.job_id else f"{args.url}/jobs")
+    _print(body)
+    return not (isinstance(body, dict) and "error" in body)
+
+
+def cmd_run(args):
+    """
+    在本程序執行一次工作 Run one job in this process, without the service
+    """
+    from crawl_service import CrawlService
+
+    workers = {"pdf_workers": 1 if args.command == "pdf" else 0,
+               "data_workers": args.workers if args.command == "data" else 0}
+    with CrawlService(download_path=args.download_path, db_path=args.db, parquet_dir=args.parquet_dir,
+                      full_refresh=args.full_refresh, site_url=args.site_url, backend=args.backend,
+                      profile=args.profile, store_path=args.store_path, **workers) as service:
+        job = service.submit(args.command, args.company_ids)
+        job = service.wait(job["job_id"])
+    _print(job)
+    return job["status"] == "done"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="公開資訊觀測站爬蟲 MOPS crawler")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def output_options(sub):
+        sub.add_argument("--download-path", default="./pdfs", help="PDF輸出目錄 PDF output directory")
+        sub.add_argument("--db", default="stock_data.db", help="SQLite資料庫 SQLite database")
+        sub.add_argument("--parquet-dir", help="另外匯出Parquet Also export Parquet datasets here")
+        sub.add_argument("--store-path", help="PDF內容定址儲存庫，未變動的欄位不重新產生 PDF store; unchanged sections are skipped")
+        sub.add_argument("--full-refresh", action="store_true", help="忽略水位重新載入全部 Ignore sync watermarks")
+        sub.add_argument("--backend", choices=("selenium", "api"), default="selenium")
+        sub.add_argument("--profile", choices=("full", "lean"), default="full")
+        sub.add_argument("--site-url", help="網站根網址，例如 mops_stub.py Site root, e.g. a mops_stub.py server")
+
+    serve_parser = subparsers.add_parser("serve", help="啟動常駐服務 Run the job service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--pdf-workers", type=int, default=1)
+    serve_parser.add_argument("--data-workers", type=int, default=2)
+    output_options(serve_parser)
+    serve_parser.set_defaults(func=cmd_serve)
+
+    submit_parser = subparsers.add_parser("submit", help="提交工作給服務 Submit a job to the service")
+    submit_parser.add_argument("kind", choices=("pdf", "data"))
+    submit_parser.add_argument("company_ids", nargs="+")
+    submit_parser.add_argument("--priority", default="high", help="high / normal / bulk")
+    submit_parser.add_argument("--wait", action="store_true", help="等待完成 Wait for the job to finish")
+    submit_parser.add_argument("--url", default=DEFAULT_URL)
+    submit_parser.set_defaults(func=cmd_submit)
+
+    status_parser = subparsers.add_parser("status", help="查詢工作 Show job status")
+    status_parser.add_argument("job_id", nargs="?")
+    status_parser.add_argument("--url", default=DEFAULT_URL)
+    status_parser.set_defaults(func=cmd_status)
+
+    for name, help_text in (("pdf", "直接產生PDF Crawl PDFs in this process"),
+                            ("data", "直接同步資料 Sync data in this process")):
+        run_parser = subparsers.add_parser(name, help=help_text)
+        run_parser.add_argument("company_ids", nargs="+")
+        run_parser.add_argument("--workers", type=int, default=4, help="資料worker數 Data workers")
+        output_options(run_parser)
+        run_parser.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = args.func(args)
+    return 1 if result is False else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
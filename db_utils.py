@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料庫共用工具 Shared Database Helpers
+本機SQLite狀態檔（快取、日誌、水位、索引）的連線方式與DB-API參數樣式判斷集中於此
+"""
+
+import sys
+import sqlite3
+from contextlib import contextmanager
+
+# 等待其他程序釋放寫入鎖的秒數 Seconds to wait for another process's write lock
+SQLITE_TIMEOUT = 30
+
+
+@contextmanager
+def sqlite_connection(path):
+    """
+    開啟SQLite資料庫，結束時提交並關閉，例外時回滾
+    Open a SQLite database; commit and close on exit, roll back on error
+
+    Args:
+        path (str): 資料庫檔案路徑 Database file path
+
+    Yields:
+        sqlite3.Connection
+    """
+    conn = sqlite3.connect(path, timeout=SQLITE_TIMEOUT)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def detect_paramstyle(connection):
+    """
+    由連線所屬驅動模組讀取paramstyle Read paramstyle from the driver module
+
+    Args:
+        connection: DB-API連線 DB-API connection
+
+    Returns:
+        str: qmark / numeric / named / format / pyformat，無法判斷時為qmark
+    """
+    module = sys.modules.get(type(connection).__module__.split(".")[0])
+    return getattr(module, "paramstyle", "qmark")
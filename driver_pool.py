@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瀏覽器驅動池 WebDriver Pool
+重複使用已啟動的Chrome，避免每支股票都重新啟動瀏覽器
+"""
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """
+    池中的瀏覽器 Pooled browser
+    記錄驅動實例與已處理頁數，用於決定何時回收
+    """
+
+    def __init__(self, driver, driver_id):
+        self.driver = driver
+        self.driver_id = driver_id
+        self.pages = 0
+
+
+class DriverPool:
+    """
+    瀏覽器驅動池 WebDriver pool
+    延遲建立最多 size 個瀏覽器，借出前做健康檢查，
+    處理超過 max_pages 頁或發生崩潰時自動回收重建
+    """
+
+    def __init__(self, driver_factory, size=1, max_pages=50, reset_url="about:blank"):
+        """
+        初始化驅動池 Initialize pool
+
+        Args:
+            driver_factory: 建立新WebDriver的函數 Callable returning a new WebDriver
+            size (int): 最大瀏覽器數量 Maximum number of browsers
+            max_pages (int): 每個瀏覽器處理幾頁後回收 Pages served before recycling
+            reset_url (str): 歸還時導向的空白頁 Page loaded when a driver is returned
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages = max_pages
+        self.reset_url = reset_url
+
+        self._idle = []
+        self._lock = threading.Lock()
+        # 歸還或回收瀏覽器時喚醒等待者 Wakes waiters when a browser is returned or discarded
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._next_id = 0
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """
+        借出瀏覽器 Acquire a browser
+        優先使用閒置且健康的瀏覽器，未達上限時才建立新的
+
+        Args:
+            timeout: 等待閒置瀏覽器的秒數，None表示無限等待
+
+        Returns:
+            PooledDriver: 可使用的瀏覽器
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pooled = None
+            with self._available:
+                # 醒來後重新檢查：可能有閒置瀏覽器，也可能有瀏覽器被回收而可以新建
+                # Re-check after every wake-up: a browser may be idle, or a discarded one frees a slot
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._created < self.size:
+                        self._created += 1
+                        self._next_id += 1
+                        driver_id = self._next_id
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No driver available in pool")
+                    self._available.wait(remaining)
+
+            if pooled is not None:
+                if self._is_healthy(pooled):
+                    return pooled
+                logger.warning("Driver #%d failed health check, recycling", pooled.driver_id)
+                self._discard(pooled)
+                continue
+
+            try:
+                driver = self.driver_factory()
+            except Exception:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+            logger.info("Driver #%d started (%d/%d in pool)", driver_id, self._created, self.size)
+            return PooledDriver(driver, driver_id)
+
+    def release(self, pooled, failed=False):
+        """
+        歸還瀏覽器 Return a browser to the pool
+
+        Args:
+            pooled: 借出的PooledDriver
+            failed (bool): 使用期間是否崩潰 Whether the browser crashed while in use
+        """
+        pooled.pages += 1
+
+        if failed or self._closed:
+            self._discard(pooled)
+            return
+
+        if self.max_pages and pooled.pages >= self.max_pages:
+            logger.info("Driver #%d served %d pages, recycling", pooled.driver_id, pooled.pages)
+            self._discard(pooled)
+            return
+
+        try:
+            # 導向空白頁，下一家公司才會完整重新載入 Reset so next company gets a full page load
+            pooled.driver.get(self.reset_url)
+        except Exception as e:
+            logger.warning("Driver #%d reset failed: %s", pooled.driver_id, str(e))
+            self._discard(pooled)
+            return
+
+        with self._available:
+            self._idle.append(pooled)
+            self._available.notify()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        以with語法借用瀏覽器 Borrow a browser with a with-statement
+        區塊內發生例外時視為崩潰並回收
+        """
+        pooled = self.acquire(timeout=timeout)
+        failed = False
+        try:
+            yield pooled
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(pooled, failed=failed)
+
+    def close(self):
+        """
+        關閉所有閒置瀏覽器 Quit all idle browsers
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+        logger.info("Driver pool closed")
+
+    def _is_healthy(self, pooled):
+        """
+        健康檢查 Health check
+        """
+        try:
+            pooled.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        """
+        關閉並移除瀏覽器 Quit and drop a browser
+        """
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning("Error quitting driver #%d: %s", pooled.driver_id, str(e))
+        logger.info("Browser driver #%d closed", pooled.driver_id)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ChromeDriver路徑解析與快取 ChromeDriver Resolver
+依Chrome主版本與平台快取已下載的ChromeDriver路徑，快取有效時不發出任何網路請求
+"""
+
+import os
+import json
+import glob
+import shutil
+import platform
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".stock_crawler", "chromedriver_cache.json")
+
+
+def _env_flag(name):
+    """
+    讀取布林環境變數 Read a boolean environment variable
+    """
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class ChromeDriverResolver:
+    """
+    ChromeDriver解析器 ChromeDriver resolver
+    快取鍵為 平台-Chrome主版本，快取存放於磁碟JSON檔
+    離線模式下只使用快取、webdriver_manager本地目錄或PATH中的chromedriver
+    """
+
+    def __init__(self, cache_path=None, offline=None):
+        """
+        初始化解析器 Initialize resolver
+
+        Args:
+            cache_path: 快取檔案路徑 Path of the on-disk cache file
+            offline (bool): 離線模式，None則讀取環境變數 STOCK_CRAWLER_OFFLINE
+                            Offline mode, defaults to the STOCK_CRAWLER_OFFLINE env var
+        """
+        self.cache_path = cache_path or os.environ.get("CHROMEDRIVER_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.offline = _env_flag("STOCK_CRAWLER_OFFLINE") if offline is None else offline
+        self._resolved = None
+        self._chrome_major = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """
+        取得ChromeDriver路徑 Resolve ChromeDriver path
+
+        Returns:
+            str or None: 可執行檔路徑，None表示交由Selenium自行尋找
+        """
+        with self._lock:
+            if self._resolved and os.path.isfile(self._resolved):
+                return self._resolved
+
+            key = self._cache_key()
+            cache = self._load_cache()
+            cached_path = cache.get(key)
+            if cached_path and os.access(cached_path, os.X_OK):
+                logger.info("ChromeDriver cache hit [%s]: %s", key, cached_path)
+                self._resolved = cached_path
+                return cached_path
+
+            if self.offline:
+                driver_path = self._find_local_driver()
+                if not driver_path:
+                    logger.error("Offline mode: no cached ChromeDriver for [%s]", key)
+                    return None
+                logger.info("Offline mode: using local ChromeDriver %s", driver_path)
+            else:
+                from webdriver_manager.chrome import ChromeDriverManager
+                driver_path = self._fix_driver_path(ChromeDriverManager().install())
+
+            cache[key] = driver_path
+            self._save_cache(cache)
+            self._resolved = driver_path
+            return driver_path
+
+    def invalidate(self):
+        """
+        移除目前平台與版本的快取 Drop the cache entry for the current key
+        用於快取的驅動無法啟動瀏覽器時 Used when a cached driver fails to start Chrome
+        """
+        with self._lock:
+            self._resolved = None
+            cache = self._load_cache()
+            if cache.pop(self._cache_key(), None):
+                self._save_cache(cache)
+                logger.info("ChromeDriver cache entry invalidated")
+
+    def _cache_key(self):
+        """
+        快取鍵：平台-架構-Chrome主版本 Cache key: platform-arch-chrome major
+        """
+        major = self._chrome_major_version() or "unknown"
+        return f"{platform.system().lower()}-{platform.machine().lower()}-{major}"
+
+    def _chrome_major_version(self):
+        """
+        由本機Chrome取得主版本（不需網路） Read local Chrome major version, no network
+        """
+        if self._chrome_major:
+            return self._chrome_major
+        try:
+            from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+            version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+        except Exception as e:
+            logger.warning("Unable to detect Chrome version: %s", str(e))
+            return None
+        self._chrome_major = version.split(".")[0] if version else None
+        return self._chrome_major
+
+    def _find_local_driver(self):
+        """
+        尋找本機已存在的ChromeDriver Find an already-installed ChromeDriver
+        依序檢查webdriver_manager快取目錄與PATH
+        """
+        major = self._chrome_major_version()
+        if major:
+            pattern = os.path.join(os.path.expanduser("~"), ".wdm", "drivers", "chromedriver",
+                                   "*", f"{major}.*", "**", "chromedriver*")
+            for candidate in sorted(glob.glob(pattern, recursive=True), reverse=True):
+                if (os.path.isfile(candidate) and os.access(candidate, os.X_OK)
+                        and "THIRD_PARTY" not in candidate and not candidate.endswith(".zip")):
+                    return candidate
+        return shutil.which("chromedriver")
+
+    def _fix_driver_path(self, driver_path):
+        """
+        修復macOS ARM64上的路徑問題 Fix path issue on macOS ARM64
+        webdriver_manager有時回傳THIRD_PARTY_NOTICES檔案而非執行檔
+        """
+        if 'THIRD_PARTY_NOTICES' in driver_path:
+            driver_dir = os.path.dirname(driver_path)
+            # 尋找實際的chromedriver可執行文件 Find the actual chromedriver executable
+            for file in os.listdir(driver_dir):
+                if file == 'chromedriver' or file.startswith('chromedriver') and not 'THIRD_PARTY' in file:
+                    driver_path = os.path.join(driver_dir, file)
+                    break
+            logger.info("Fixed ChromeDriver path: %s", driver_path)
+
+        # 修復執行權限 Fix execute permissions
+        if not os.access(driver_path, os.X_OK):
+            os.chmod(driver_path, 0o755)
+            logger.info("Set execute permissions: %s", driver_path)
+        return driver_path
+
+    def _load_cache(self):
+        """
+        讀取磁碟快取 Load on-disk cache
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        """
+        寫入磁碟快取 Persist cache atomically
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(cache, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料表組裝 Frame Builder
+將 t146sb05 與營收明細回應逐欄累積，每家公司或每批次只建立一次DataFrame
+"""
+
+import pandas as pd
+
+from mops_api import REVENUE_COLUMNS, REPORT_ITEMS
+from metrics import METRICS
+
+# 營收表欄位（含股票代碼） Revenue table columns, including the company ID
+REVENUE_TABLE_COLUMNS = REVENUE_COLUMNS + ['股票代碼']
+
+# 財報表欄位：長表，每個項目每一期一列 Report table columns, long form: one row per line item and period
+REPORT_TABLE_COLUMNS = ['股票代碼', '報表', '項目', '期間', '金額']
+
+# 營收數值欄位型別 Dtypes of the numeric revenue columns
+REVENUE_DTYPES = {
+    '年份': 'Int16',
+    '月份': 'Int8',
+    '當月營收': 'Int64',
+    '去年當月營收': 'Int64',
+    '去年同月增減(%)': 'Float64',
+    '當月累計營收': 'Int64',
+    '去年累計營收': 'Int64',
+    '前期比較增減(%)': 'Float64',
+}
+
+
+def to_number(series, dtype):
+    """
+    將文字數值轉為指定型別 Convert text numbers to a numeric dtype
+    移除千分位逗號與百分比符號，括號表示負數，無法解析的值為NA
+    Strips thousands separators and %, parentheses mean negative, unparsable values become NA
+    """
+    text = series.astype('string').str.replace(r'[,%\s]', '', regex=True)
+    text = text.str.replace(r'^\((.+)\)$', r'-\1', regex=True)
+    numbers = pd.to_numeric(text, errors='coerce')
+    if dtype.startswith('Int'):
+        numbers = numbers.round()
+    return numbers.astype(dtype)
+
+
+class _Columns:
+    """
+    逐欄累積器 Column-wise accumulator
+    每欄一個list，新欄位出現時以None補齊先前的列 A list per column; new columns are back-filled with None
+    """
+
+    def __init__(self, columns=None):
+        self.data = {column: [] for column in (columns or [])}
+        self.rows = 0
+
+    def append(self, record):
+        """
+        加入一列（dict） Append one row given as a dict
+        """
+        for column in record:
+            if column not in self.data:
+                self.data[column] = [None] * self.rows
+        for column, values in self.data.items():
+            values.append(record.get(column))
+        self.rows += 1
+
+    def extend(self, columns, rows, fixed=None):
+        """
+        加入多列（list），fixed為每列共用的欄位值 Append list rows; fixed holds values shared by every row
+        """
+        fixed = fixed or {}
+        names = list(fixed) + list(columns)
+        for column in names:
+            if column not in self.data:
+                self.data[column] = [None] * self.rows
+        for column, value in fixed.items():
+            self.data[column].extend([value] * len(rows))
+        for index, column in enumerate(columns):
+            self.data[column].extend(row[index] if index < len(row) else None for row in rows)
+        for column, values in self.data.items():
+            if column not in names:
+                values.extend([None] * len(rows))
+        self.rows += len(rows)
+
+    def frame(self):
+        """
+        一次建立DataFrame Build the DataFrame once
+        """
+        return pd.DataFrame(self.data)
+
+
+class FrameBuilder:
+    """
+    三張表的組裝器 Builder for the three tables
+    可一次加入一家或多家公司，最後各建立一次 基本資料、營收資訊、財報資訊 DataFrame
+    """
+
+    def __init__(self):
+        self._basic = _Columns()
+        self._revenue = _Columns(REVENUE_TABLE_COLUMNS)
+        self._report = _Columns(REPORT_TABLE_COLUMNS)
+
+    def add_company(self, stock_code, output, revenue_rows):
+        """
+        加入一家公司的資料 Add one company
+
+        Args:
+            stock_code (str): 股票代碼 Stock company ID
+            output (dict): t146sb05 回應中的result
+            revenue_rows (list): 營收明細API的data
+        """
+        self.add_basic(stock_code, output)
+        self.add_revenue(stock_code, revenue_rows)
+        self.add_report(stock_code, output)
+
+    def add_basic(self, stock_code, output):
+        """
+        基本資料：一家公司一列 Basic info, one row per company
+        """
+        self._basic.append({'股票代碼': stock_code, **output['basic_info']})
+
+    def add_revenue(self, stock_code, revenue_rows):
+        """
+        營收資訊：每月一列 Revenue, one row per month
+        """
+        self._revenue.extend(REVENUE_COLUMNS, revenue_rows, fixed={'股票代碼': stock_code})
+
+    def add_report(self, stock_code, output):
+        """
+        財報資訊：轉為長表，CAL/CCSI/CCFS每個項目每一期一列
+        Financial report in long form, one row per statement line and period
+        期間（例如113年第2季）是資料值而非欄名，MOPS換季時表結構不變
+        The period (e.g. 113年第2季) is a value, not a column name, so the schema survives quarter rollovers
+        """
+        report = output['financial_report_information']
+        periods = [title['main'] for title in report['titles']][1:]
+        for item in REPORT_ITEMS:
+            rows = [[line[0], period, line[index + 1] if index + 1 < len(line) else None]
+                    for line in report[item] for index, period in enumerate(periods)]
+            self._report.extend(['項目', '期間', '金額'], rows, fixed={'股票代碼': stock_code, '報表': item})
+
+    def basic_frame(self):
+        return self._basic.frame()
+
+    def revenue_frame(self):
+        """
+        營收表，數值欄位轉為數值型別 Revenue table with typed numeric columns
+        """
+        df = self._revenue.frame()
+        for column, dtype in REVENUE_DTYPES.items():
+            df[column] = to_number(df[column], dtype)
+        df['股票代碼'] = df['股票代碼'].astype('string')
+        return df[REVENUE_TABLE_COLUMNS]
+
+    def report_frame(self):
+        """
+        財報表，金額轉為數值 Report table with a numeric amount
+        """
+        df = self._report.frame()
+        df['金額'] = to_number(df['金額'], 'Float64')
+        for column in REPORT_TABLE_COLUMNS[:-1]:
+            df[column] = df[column].astype('string')
+        return df[REPORT_TABLE_COLUMNS]
+
+    def frames(self):
+        """
+        Returns:
+            tuple: (基本資料, 營收資訊, 財報資訊) DataFrames
+        """
+        with METRICS.timer("frame_build"):
+            return self.basic_frame(), self.revenue_frame(), self.report_frame()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API回應磁碟快取 On-disk HTTP Response Cache
+以SQLite保存MOPS API回應，依端點設定有效期、依容量做LRU淘汰，過期後以條件請求重新驗證
+"""
+
+import json
+import time
+import hashlib
+import logging
+
+import requests
+
+from db_utils import sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    cache_key     TEXT PRIMARY KEY,
+    endpoint      TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    body          BLOB NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    size          INTEGER NOT NULL
+)
+"""
+
+# 各端點預設有效秒數 Default TTL per endpoint, in seconds
+DEFAULT_TTLS = {
+    "t146sb05": 6 * 3600,
+}
+
+
+class CachedResponse:
+    """
+    快取項目 Cache entry
+    """
+
+    def __init__(self, endpoint, status, body, etag, last_modified, stored_at):
+        self.endpoint = endpoint
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def validators(self):
+        """
+        條件請求標頭 Conditional request headers
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self, url):
+        """
+        轉為requests.Response，呼叫端不需區分來源 Rebuild a requests.Response so callers need not care
+        """
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+class ResponseCache:
+    """
+    回應快取 Response cache
+    每次操作各自開啟連線並使用WAL，多執行緒與多程序可共用同一個快取檔
+    """
+
+    def __init__(self, path="./mops_cache.sqlite3", default_ttl=6 * 3600, ttls=None, max_bytes=256 * 1024 * 1024):
+        """
+        初始化快取 Initialize cache
+
+        Args:
+            path (str): 快取資料庫路徑 Cache database path
+            default_ttl (float): 未指定端點的有效秒數 TTL for endpoints not in ttls
+            ttls (dict): 端點對應有效秒數 TTL per endpoint name
+            max_bytes (int): 快取容量上限 Cache size bound
+        """
+        self.path = path
+        self.default_ttl = default_ttl
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        with sqlite_connection(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    @staticmethod
+    def key(url, payload):
+        """
+        以網址與請求內容產生快取鍵 Cache key from URL and payload
+        """
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{url}|{encoded}".encode('utf-8')).hexdigest()
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, cache_key):
+        """
+        讀取快取並更新存取時間 Read an entry and bump its access time
+
+        Returns:
+            CachedResponse or None
+        """
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT endpoint, status, body, etag, last_modified, stored_at FROM responses WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return CachedResponse(*row)
+
+    def is_fresh(self, entry):
+        """
+        是否仍在有效期內 Whether an entry is within its TTL
+        """
+        return time.time() - entry.stored_at < self.ttl(entry.endpoint)
+
+    def put(self, cache_key, endpoint, response):
+        """
+        寫入成功回應，超過容量時淘汰最久未使用者 Store a response and evict least recently used entries
+        """
+        body = response.content
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(cache_key, endpoint, status, body, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, endpoint, response.status_code, body, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now, len(body)),
+            )
+            self._evict(conn)
+
+    def refresh(self, cache_key):
+        """
+        伺服器回應304時延長有效期 Extend an entry after a 304 Not Modified
+        """
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE cache_key = ?",
+                         (now, now, cache_key))
+
+    def _evict(self, conn):
+        """
+        LRU淘汰 Least-recently-used eviction
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for cache_key, size in conn.execute("SELECT cache_key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+            total -= size
+            evicted += 1
+        logger.info("Evicted %d cached responses", evicted)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次工作日誌 Batch Job Journal
+以SQLite記錄每家公司、每個欄位的爬取狀態與嘗試次數，中斷後只續跑未完成的部分
+"""
+
+import time
+import logging
+
+from db_utils import sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_sections (
+    job_id      TEXT NOT NULL,
+    company_id  TEXT NOT NULL,
+    section     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (job_id, company_id, section)
+)
+"""
+
+# 狀態 Section states
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+# 預設欄位，與 stock_pdf_crawler.SECTIONS 的 filename_suffix 相同
+# Default sections, matching filename_suffix in stock_pdf_crawler.SECTIONS
+DEFAULT_SECTIONS = ("basic", "revenue", "financial")
+
+
+class JobJournal:
+    """
+    工作日誌 Job journal
+    只由排程器所在的程序寫入；in_progress 表示上次執行中斷，續跑時視為未完成
+    Written by the scheduler process only; in_progress left behind by a crash counts as unfinished
+    """
+
+    def __init__(self, path="./crawl_jobs.sqlite3", job_id="default", sections=DEFAULT_SECTIONS):
+        """
+        初始化日誌 Initialize journal
+
+        Args:
+            path (str): 日誌資料庫路徑 Journal database path
+            job_id (str): 工作名稱，同名工作可續跑 Job name; reusing it resumes the job
+            sections (tuple): 每家公司要完成的欄位 Sections every company must complete
+        """
+        self.path = path
+        self.job_id = job_id
+        self.sections = tuple(sections)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(SCHEMA)
+
+    def enqueue(self, company_ids):
+        """
+        加入公司，已存在者保留原狀態 Add companies; existing rows keep their state
+
+        Returns:
+            int: 新加入的欄位數 Newly added section rows
+        """
+        now = time.time()
+        rows = [(self.job_id, company_id, section, PENDING, now)
+                for company_id in dict.fromkeys(company_ids) for section in self.sections]
+        with sqlite_connection(self.path) as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_sections (job_id, company_id, section, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = conn.total_changes - before
+        if added:
+            logger.info("Job %s: queued %d sections", self.job_id, added)
+        return added
+
+    def unfinished(self, company_ids=None, retry_failed_only=False):
+        """
+        取得未完成的工作 Work still to do
+
+        Args:
+            company_ids (list): 只看這些公司，None則全部 Restrict to these companies, all if None
+            retry_failed_only (bool): 只重試失敗的欄位 Only sections that failed
+
+        Returns:
+            dict: 股票代碼對應未完成欄位列表，依加入順序 company_id -> [section], in queue order
+        """
+        statuses = (FAILED,) if retry_failed_only else (PENDING, IN_PROGRESS, FAILED)
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                "SELECT company_id, section FROM job_sections WHERE job_id = ? AND status IN ({}) "
+                "ORDER BY rowid".format(", ".join("?" * len(statuses))),
+                (self.job_id,) + statuses,
+            ).fetchall()
+        wanted = set(company_ids) if company_ids is not None else None
+        work = {}
+        for company_id, section in rows:
+            if wanted is None or company_id in wanted:
+                work.setdefault(company_id, []).append(section)
+        return work
+
+    def start(self, company_id, sections):
+        """
+        標記為執行中並累計嘗試次數 Mark sections in progress and count the attempt
+        """
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "UPDATE job_sections SET status = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND company_id = ? AND section = ?",
+                [(IN_PROGRESS, time.time(), self.job_id, company_id, section) for section in sections],
+            )
+
+    def finish(self, company_id, section_results, error=None):
+        """
+        記錄各欄位結果 Record per-section results
+
+        Args:
+            company_id (str): 股票代碼
+            section_results (dict): 欄位對應是否成功 section -> success
+            error (str): 失敗原因 Failure reason
+        """
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "UPDATE job_sections SET status = ?, last_error = ?, updated_at = ? "
+                "WHERE job_id = ? AND company_id = ? AND section = ?",
+                [(DONE if success else FAILED, None if success else error, now,
+                  self.job_id, company_id, section)
+                 for section, success in section_results.items()],
+            )
+
+    def company_status(self, company_ids):
+        """
+        各公司是否全部欄位完成 Whether every section of each company is done
+
+        Returns:
+            dict: company_id -> bool
+        """
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                "SELECT company_id, MIN(status = ?) FROM job_sections WHERE job_id = ? GROUP BY company_id",
+                (DONE, self.job_id),
+            ).fetchall()
+        done = dict(rows)
+        return {company_id: bool(done.get(company_id)) for company_id in company_ids}
+
+    def summary(self):
+        """
+        各狀態欄位數 Section counts per state
+        """
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM job_sections WHERE job_id = ? GROUP BY status",
+                (self.job_id,),
+            ).fetchall()
+        return dict(rows)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+執行指標 Run Metrics
+各階段計時與計數，執行結束時輸出Prometheus文字格式與JSON摘要
+每次記錄只是一次加鎖與幾個加法，正式環境可常態開啟
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 直方圖上限（秒） Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 指標名稱前綴 Metric name prefix
+PREFIX = "stock_crawler_"
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Metrics:
+    """
+    指標登錄 Metrics registry
+    計時器寫入直方圖，計數器累加；每家公司另記各階段耗時供JSON摘要
+    Timers feed histograms and counters add up; per-company phase totals go to the JSON summary
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._companies = {}
+
+    @contextmanager
+    def timer(self, name, company_id=None, **labels):
+        """
+        計時區塊 Time a block
+
+        Args:
+            name (str): 階段名稱 Phase name, e.g. driver_get, print_to_pdf
+            company_id (str): 同時計入該公司的階段耗時 Also add to this company's phase totals
+            labels: 標籤，例如 section Labels such as section
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, company_id, **labels)
+
+    def observe(self, name, seconds, company_id=None, **labels):
+        """
+        記錄一次耗時 Record one duration
+        """
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0,
+                                                     "count": 0, "max": 0.0}
+            histogram["counts"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            histogram["max"] = max(histogram["max"], seconds)
+            if company_id is not None:
+                phases = self._companies.setdefault(str(company_id), {})
+                phases[name] = phases.get(name, 0.0) + seconds
+
+    def inc(self, name, value=1, **labels):
+        """
+        計數器累加 Increment a counter
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """
+        可序列化的內容，供跨程序合併 Picklable contents for merging across processes
+        """
+        with self._lock:
+            return {
+                "histograms": {key: dict(h, counts=list(h["counts"])) for key, h in self._histograms.items()},
+                "counters": dict(self._counters),
+                "companies": {cid: dict(phases) for cid, phases in self._companies.items()},
+            }
+
+    def merge(self, snapshot):
+        """
+        合併其他程序的snapshot() Merge a snapshot() from another process
+        """
+        with self._lock:
+            for key, other in snapshot["histograms"].items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    self._histograms[key] = dict(other, counts=list(other["counts"]))
+                    continue
+                histogram["counts"] = [a + b for a, b in zip(histogram["counts"], other["counts"])]
+                histogram["sum"] += other["sum"]
+                histogram["count"] += other["count"]
+                histogram["max"] = max(histogram["max"], other["max"])
+            for key, value in snapshot["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for company_id, phases in snapshot["companies"].items():
+                mine = self._companies.setdefault(company_id, {})
+                for name, seconds in phases.items():
+                    mine[name] = mine.get(name, 0.0) + seconds
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._companies.clear()
+
+    def _quantile(self, histogram, q):
+        """
+        由直方圖估計分位數（取所在區間上限） Estimate a quantile as its bucket's upper bound
+        """
+        target = q * histogram["count"]
+        seen = 0
+        for index, count in enumerate(histogram["counts"]):
+            seen += count
+            if seen >= target and count:
+                return self.buckets[index] if index < len(self.buckets) else histogram["max"]
+        return histogram["max"]
+
+    def to_prometheus(self):
+        """
+        Prometheus文字格式 Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for (name, labels), histogram in sorted(snapshot["histograms"].items()):
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram["counts"]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram['count']}")
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            metric = f"{PREFIX}{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        JSON摘要 JSON-friendly summary
+
+        Returns:
+            dict: phases（各階段次數、總和、平均、p50/p95、最大）、counters、companies（每家各階段秒數）
+        """
+        snapshot = self.snapshot()
+        phases = []
+        for (name, labels), histogram in sorted(snapshot["histograms"].items()):
+            phases.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": histogram["count"],
+                "sum": round(histogram["sum"], 6),
+                "mean": round(histogram["sum"] / histogram["count"], 6) if histogram["count"] else 0.0,
+                "p50": self._quantile(histogram, 0.5),
+                "p95": self._quantile(histogram, 0.95),
+                "max": round(histogram["max"], 6),
+            })
+        counters = [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(snapshot["counters"].items())]
+        companies = {cid: {name: round(seconds, 6) for name, seconds in phases_.items()}
+                     for cid, phases_ in sorted(snapshot["companies"].items())}
+        return {"phases": phases, "counters": counters, "companies": companies}
+
+    def export(self, directory, name):
+        """
+        輸出 <name>.prom 與 <name>.json Write <name>.prom and <name>.json
+
+        Returns:
+            tuple: (prom_path, json_path)
+        """
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, f"{name}.prom")
+        json_path = os.path.join(directory, f"{name}.json")
+        for path, content in ((prom_path, self.to_prometheus()),
+                              (json_path, json.dumps(self.summary(), ensure_ascii=False, indent=2))):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        return prom_path, json_path
+
+
+# 程序內共用的登錄 Process-wide registry
+METRICS = Metrics()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公開資訊觀測站API用戶端 MOPS API Client
+封裝 t146sb05 與營收明細API的請求
+"""
+
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = "https://mops.twse.com.tw/mops/api"
+
+HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'Mozilla/5.0',
+    'Origin': 'https://mops.twse.com.tw',
+    'Referer': 'https://mops.twse.com.tw/mops/web/t146sb05',
+}
+
+# 營收明細欄位（API每列的順序） Revenue columns, in the order of each API row
+REVENUE_COLUMNS = ['年份', '月份', '當月營收', '去年當月營收', '去年同月增減(%)',
+                   '當月累計營收', '去年累計營收', '前期比較增減(%)']
+
+# 財報資訊項目 Financial report items
+REPORT_ITEMS = ['CAL', 'CCSI', 'CCFS']
+
+# 無效股票代碼時API回傳的訊息 Message returned by the API for an invalid company ID
+INVALID_COMPANY_TEXT = "公司代號格式錯誤"
+
+
+# 可重試的HTTP狀態碼 HTTP statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# 網站限流或封鎖時的錯誤頁面文字 Text of the error pages served when the site throttles or blocks
+THROTTLE_MARKERS = ("查詢過量", "因為安全性考量", "FOR SECURITY REASONS", "頁面無法執行")
+
+
+def is_throttle_page(text):
+    """
+    是否為限流錯誤頁面 Whether a page is a throttling/blocking error page
+    """
+    return bool(text) and any(marker in text for marker in THROTTLE_MARKERS)
+
+
+def _cacheable(response):
+    """
+    是否可寫入快取：只快取JSON內容，限流錯誤頁面或其他非JSON回應不快取
+    Only JSON bodies are cached; throttling error pages and other non-JSON responses never are
+    """
+    if response.status_code != 200 or 'json' not in response.headers.get('Content-Type', ''):
+        return False
+    if is_throttle_page(response.text):
+        return False
+    try:
+        response.json()
+    except ValueError:
+        return False
+    return True
+
+
+def _retry_after(response):
+    """
+    Retry-After 秒數，無法解析則None Retry-After in seconds, None if absent or a date
+    """
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+class InvalidCompanyError(Exception):
+    """
+    股票代碼無效 Invalid company ID
+    """
+
+
+class MopsClient:
+    """
+    公開資訊觀測站API用戶端 MOPS API client
+    以keep-alive連線池共用TLS連線，失敗時以隨機抖動的指數退避重試
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=30, rate_limiter=None,
+                 max_connections=16, retries=3, backoff=0.5, connect_timeout=5, cache=None):
+        """
+        初始化用戶端 Initialize client
+
+        Args:
+            base_url (str): API根網址 API base URL
+            timeout (float): 讀取超時秒數 Read timeout in seconds
+            rate_limiter: 共用的請求速率限制器 Shared RateLimiter, unlimited if None
+            max_connections (int): 連線池大小 Keep-alive pool size
+            retries (int): 失敗重試次數 Retries after the first attempt
+            backoff (float): 退避基準秒數 Base backoff in seconds
+            connect_timeout (float): 連線超時秒數 Connect timeout in seconds
+            cache (ResponseCache): 磁碟回應快取，None則不快取 On-disk response cache, disabled if None
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.cache = cache
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        """
+        關閉連線池 Close connection pool
+        """
+        self.session.close()
+
+    def fetch_company(self, company_id, need_revenue=None):
+        """
+        依序取得t146sb05與完整營收明細 Fetch t146sb05, then the dependent revenue history
+
+        Args:
+            company_id (str): 股票代碼 Stock company ID
+            need_revenue: 判斷是否需要營收明細的函數 (company_id, info) -> bool，None表示一律請求
+                          Callable deciding whether the revenue call is needed; always fetched if None
+
+        Returns:
+            tuple: (t146sb05 result, 營收明細列 revenue rows，跳過時為None)
+        """
+        info = self.fetch_company_info(company_id)
+        if need_revenue is not None and not need_revenue(company_id, info):
+            return info, None
+        api_name = info['revenue_information']['moreInfoUrl']['apiName']
+        return info, self.fetch_revenue(company_id, api_name)
+
+    def fetch_many(self, company_ids, workers=8, need_revenue=None):
+        """
+        平行取得多家公司資料 Fetch many companies concurrently
+        每個t146sb05回應一到，同一工作立即接著請求營收明細
+        Each revenue call is issued as soon as its t146sb05 response arrives
+
+        Args:
+            company_ids (list): 股票代碼列表 List of stock company IDs
+            workers (int): 同時進行的公司數 Companies in flight at once
+            need_revenue: 見 fetch_company See fetch_company
+
+        Yields:
+            tuple: (company_id, (info, revenue_rows) 或 None, 例外或None)，依完成順序
+                   (company_id, result or None, exception or None), in completion order
+        """
+        def timed(company_id):
+            # 每家公司的請求耗時計入 company_fetch Per-company time recorded as company_fetch
+            with METRICS.timer("company_fetch", company_id=company_id):
+                return self.fetch_company(company_id, need_revenue)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, self.max_connections))) as executor:
+            futures = {executor.submit(timed, company_id): company_id for company_id in company_ids}
+            for future in as_completed(futures):
+                company_id = futures[future]
+                try:
+                    yield company_id, future.result(), None
+                except Exception as e:
+                    yield company_id, None, e
+
+    def fetch_company_info(self, company_id):
+        """
+        取得公司基本資料、營收與財報摘要 Fetch t146sb05 payload
+
+        Args:
+            company_id (str): 股票代碼 Stock company ID
+
+        Returns:
+            dict: 回應中的result欄位 The payload's result field
+
+        Raises:
+            InvalidCompanyError: 股票代碼無效
+        """
+        response = self._post("t146sb05", {"companyId": company_id})
+        if INVALID_COMPANY_TEXT in response.text:
+            raise InvalidCompanyError(company_id)
+        response.raise_for_status()
+        return response.json()['result']
+
+    def fetch_revenue(self, company_id, api_name):
+        """
+        取得完整月營收歷史 Fetch full monthly revenue history
+
+        Args:
+            company_id (str): 股票代碼 Stock company ID
+            api_name (str): revenue_information.moreInfoUrl.apiName
+
+        Returns:
+            list: 每月一列的營收資料 One row per month
+        """
+        response = self._post(api_name, {"company_id": company_id})
+        response.raise_for_status()
+        return response.json()['result']['data']
+
+    def _post(self, api_name, payload):
+        """
+        送出POST請求，有效期內直接使用快取，過期則以條件請求重新驗證
+        Send POST; fresh cache entries are served without network I/O, stale ones are revalidated
+        """
+        url = f"{self.base_url}/{api_name}"
+        if self.cache is None:
+            return self._send(api_name, url, payload)
+
+        cache_key = self.cache.key(url, payload)
+        entry = self.cache.get(cache_key)
+        if entry and self.cache.is_fresh(entry):
+            METRICS.inc("http_cache", endpoint=api_name, result="hit")
+            return entry.to_response(url)
+
+        response = self._send(api_name, url, payload, entry.validators() if entry else None)
+        if response.status_code == 304 and entry:
+            METRICS.inc("http_cache", endpoint=api_name, result="revalidated")
+            self.cache.refresh(cache_key)
+            return entry.to_response(url)
+        METRICS.inc("http_cache", endpoint=api_name, result="miss")
+        if _cacheable(response):
+            self.cache.put(cache_key, api_name, response)
+        return response
+
+    def _send(self, api_name, url, payload, headers=None):
+        """
+        實際送出請求，連線錯誤、逾時、429、5xx與限流錯誤頁面會重試
+        Send the request, retrying transport errors, 429, 5xx and throttling error pages
+        回應延遲與限流訊號回報給速率限制器 Latency and throttling signals are fed back to the rate limiter
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                METRICS.observe("rate_wait", self.rate_limiter.acquire(), path="http")
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, headers=headers,
+                                             timeout=(self.connect_timeout, self.timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                METRICS.observe("http_request", time.perf_counter() - start, endpoint=api_name)
+                if self.rate_limiter:
+                    self.rate_limiter.record(throttled=True)
+                if attempt >= self.retries:
+                    raise
+                reason = str(e)
+            else:
+                latency = time.perf_counter() - start
+                METRICS.observe("http_request", latency, endpoint=api_name)
+                METRICS.inc("http_responses", endpoint=api_name, status=response.status_code)
+                error_page = 'html' in response.headers.get('Content-Type', '') and is_throttle_page(response.text)
+                throttled = response.status_code in RETRY_STATUSES or error_page
+                if self.rate_limiter:
+                    self.rate_limiter.record(latency, throttled, _retry_after(response) if throttled else None)
+                if not throttled or attempt >= self.retries:
+                    return response
+                reason = "throttling error page" if error_page else f"HTTP {response.status_code}"
+
+            attempt += 1
+            METRICS.inc("http_retries", endpoint=api_name)
+            delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.warning("Retrying %s (%d/%d) in %.2fs: %s", api_name, attempt, self.retries, delay, reason)
+            time.sleep(delay)
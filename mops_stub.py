@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公開資訊觀測站本機替身 Local MOPS Stand-in Server
+以 fixtures 目錄的 t146sb05／營收明細JSON與靜態的t146sb05頁面回應，可設定延遲與錯誤注入，供離線測試與效能評測
+"""
+
+import os
+import copy
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from mops_api import INVALID_COMPANY_TEXT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 限流錯誤頁面 Throttling error page, as served by the real site
+THROTTLE_PAGE = "<html><body>因為安全性考量，您所執行的頁面無法呈現 FOR SECURITY REASONS, THIS PAGE CAN NOT BE ACCESSED!</body></html>"
+
+
+class _Fixtures:
+    """
+    替身資料 Fixture responses
+    內附的是人工合成資料，可用 record_fixtures() 換成正式站的真實回應，見 fixtures/README.md
+    The bundled files are synthetic; record_fixtures() replaces them with live responses, see fixtures/README.md
+    沒有該公司的資料檔時，以第一份為範本換上股票代碼 Unknown IDs reuse the first file as a template
+    """
+
+    def __init__(self, fixtures_dir):
+        self.page = self._read(os.path.join(fixtures_dir, "t146sb05.html"))
+        self.info = self._load_dir(os.path.join(fixtures_dir, "t146sb05"))
+        self.revenue = self._load_dir(os.path.join(fixtures_dir, "revenue"))
+        if not self.info or not self.revenue:
+            raise ValueError(f"No fixtures found in {fixtures_dir}")
+        self._info_template = self.info[sorted(self.info)[0]]
+        self._revenue_template = self.revenue[sorted(self.revenue)[0]]
+
+    @staticmethod
+    def _read(path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def _load_dir(self, directory):
+        if not os.path.isdir(directory):
+            return {}
+        return {name[:-5]: json.loads(self._read(os.path.join(directory, name)))
+                for name in os.listdir(directory) if name.endswith(".json")}
+
+    def info_for(self, company_id):
+        if company_id in self.info:
+            return self.info[company_id]
+        body = copy.deepcopy(self._info_template)
+        result = body["result"]
+        result["basic_info"]["公司代號"] = company_id
+        result["basic_info"]["公司名稱"] = f"測試公司{company_id}"
+        result["revenue_information"]["moreInfoUrl"].setdefault("parameters", {})["companyId"] = company_id
+        return body
+
+    def revenue_for(self, company_id):
+        return self.revenue.get(company_id, self._revenue_template)
+
+
+class MopsStub:
+    """
+    替身伺服器 Stand-in server
+    在背景執行緒提供 /mops/（SPA頁面）與 /mops/api/<name>（JSON API）
+    """
+
+    def __init__(self, fixtures_dir=DEFAULT_FIXTURES, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 invalid_ids=("0001",), host="127.0.0.1", port=0, seed=None):
+        """
+        初始化 Initialize
+
+        Args:
+            fixtures_dir (str): 替身資料目錄 Fixtures directory
+            latency (float): 每個API回應的固定延遲秒數 Fixed delay per API response
+            jitter (float): 額外隨機延遲上限秒數 Extra uniform random delay
+            error_rate (float): 回傳503的機率 Probability of an HTTP 503
+            throttle_rate (float): 回傳限流錯誤頁面的機率 Probability of a throttling error page
+            invalid_ids (tuple): 視為無效的股票代碼 IDs answered with the invalid-company message
+            host (str): 綁定位址 Bind address
+            port (int): 連接埠，0為自動 Port, 0 picks a free one
+            seed (int): 亂數種子，讓錯誤注入可重現 Random seed for reproducible injection
+        """
+        self.fixtures = _Fixtures(fixtures_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.invalid_ids = set(invalid_ids)
+        self.hits = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        網站根網址，傳給 StockPDFCrawler(site_url=...) Site root, for StockPDFCrawler(site_url=...)
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        """
+        API網址，傳給 MopsClient(base_url=...) API base, for MopsClient(base_url=...)
+        """
+        return f"{self.url}/mops/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("MOPS stand-in listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _inject(self):
+        """
+        依設定延遲並決定是否注入錯誤 Apply latency and pick an injected failure
+
+        Returns:
+            str or None: "error"、"throttle" 或 None
+        """
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._random.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.throttle_rate:
+            return "throttle"
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self.hits[name] = self.hits.get(name, 0) + 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 標頭與內容分兩次寫出，關閉Nagle避免延遲ACK拉高量測延遲 Headers and body are separate writes
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                data = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path in ("/mops", "/mops/", "/mops/index.html") or path.startswith("/mops/web/"):
+                    stub._count("page")
+                    self._send(200, stub.fixtures.page, "text/html; charset=utf-8")
+                else:
+                    self._send(404, "", "text/plain")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    payload = {}
+                if not self.path.startswith("/mops/api/"):
+                    self._send(404, "", "text/plain")
+                    return
+                api_name = self.path.rsplit("/", 1)[1]
+                stub._count(api_name)
+
+                failure = stub._inject()
+                if failure == "error":
+                    self._send(503, "Service Unavailable", "text/plain")
+                    return
+                if failure == "throttle":
+                    self._send(200, THROTTLE_PAGE, "text/html; charset=utf-8")
+                    return
+
+                company_id = str(payload.get("companyId") or payload.get("company_id") or "")
+                if api_name == "t146sb05":
+                    if company_id in stub.invalid_ids:
+                        self._send(200, INVALID_COMPANY_TEXT, "text/plain; charset=utf-8")
+                        return
+                    body = stub.fixtures.info_for(company_id)
+                else:
+                    body = stub.fixtures.revenue_for(company_id)
+                self._send(200, json.dumps(body, ensure_ascii=False), "application/json; charset=utf-8")
+
+        return Handler
+
+
+def record_fixtures(company_ids, fixtures_dir=DEFAULT_FIXTURES, client=None):
+    """
+    由正式站錄製回應 Record live responses as fixtures
+
+    Args:
+        company_ids (list): 股票代碼
+        fixtures_dir (str): 輸出目錄 Output directory
+        client (MopsClient): API用戶端，None則自行建立
+    """
+    from mops_api import MopsClient
+
+    client = client or MopsClient()
+    os.makedirs(os.path.join(fixtures_dir, "t146sb05"), exist_ok=True)
+    os.makedirs(os.path.join(fixtures_dir, "revenue"), exist_ok=True)
+    for company_id in company_ids:
+        info = client.fetch_company_info(company_id)
+        rows = client.fetch_revenue(company_id, info['revenue_information']['moreInfoUrl']['apiName'])
+        for kind, body in (("t146sb05", {"result": info}), ("revenue", {"result": {"data": rows}})):
+            with open(os.path.join(fixtures_dir, kind, f"{company_id}.json"), "w", encoding="utf-8") as file:
+                json.dump(body, file, ensure_ascii=False, indent=1)
+        logger.info("Recorded fixtures for company_id %s", company_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="公開資訊觀測站本機替身 Local MOPS stand-in")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="API延遲秒數 API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="額外隨機延遲 Extra random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503機率 Probability of HTTP 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="限流頁面機率 Probability of a throttle page")
+    parser.add_argument("--record", nargs="*", metavar="ID", help="由正式站錄製這些代碼後結束 Record these IDs and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+    else:
+        stub = MopsStub(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, port=args.port).start()
+        print(f"site_url={stub.url}  api_url={stub.api_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            stub.stop()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+頁面就緒判斷 Page Readiness
+以網路閒置與DOM變動訊號取代固定的time.sleep等待
+"""
+
+import time
+import logging
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger(__name__)
+
+# 於每個新文件載入前注入：追蹤進行中的fetch/XHR與最後一次網路或DOM活動時間
+# Injected before every document: tracks in-flight fetch/XHR and the last network or DOM activity
+READINESS_SCRIPT = """
+(function () {
+  if (window.__crawlerReadiness) { return; }
+  var state = window.__crawlerReadiness = {pending: 0, last: Date.now()};
+  function touch() { state.last = Date.now(); }
+  function done() { state.pending = Math.max(0, state.pending - 1); touch(); }
+  if (window.fetch) {
+    var originalFetch = window.fetch;
+    window.fetch = function () {
+      state.pending++; touch();
+      return originalFetch.apply(this, arguments).finally(done);
+    };
+  }
+  var originalSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    state.pending++; touch();
+    this.addEventListener('loadend', done);
+    return originalSend.apply(this, arguments);
+  };
+  new MutationObserver(touch).observe(document, {childList: true, subtree: true, characterData: true});
+})();
+"""
+
+# 就緒條件：文件載入完成、容器已渲染、無進行中請求且閒置超過idle_ms
+# Ready when the document is complete, the container has content, nothing is in flight and the page is quiet
+READY_CHECK_SCRIPT = """
+var selector = arguments[0], idleMs = arguments[1];
+if (document.readyState !== 'complete') { return false; }
+if (selector) {
+  var el = document.querySelector(selector);
+  if (!el || !el.textContent.trim()) { return false; }
+}
+var state = window.__crawlerReadiness;
+if (!state) { return true; }
+return state.pending === 0 && (Date.now() - state.last) >= idleMs;
+"""
+
+
+class PageReadiness:
+    """
+    頁面就緒判斷器 Page readiness engine
+    等待網路閒置與資料容器渲染完成，頁面已就緒時立即返回，並以max_wait為上限
+    """
+
+    def __init__(self, idle_ms=300, max_wait=15, poll_interval=0.1):
+        """
+        初始化 Initialize
+
+        Args:
+            idle_ms (int): 無網路與DOM活動多久視為閒置（毫秒） Quiet period counted as idle, in ms
+            max_wait (float): 最長等待秒數 Maximum seconds to wait
+            poll_interval (float): 輪詢間隔秒數 Polling interval in seconds
+        """
+        self.idle_ms = idle_ms
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def install(driver):
+        """
+        對瀏覽器注入追蹤腳本 Install tracking script on a browser
+        透過CDP讓之後載入的每個頁面都帶有追蹤腳本
+        """
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': READINESS_SCRIPT})
+        except Exception as e:
+            logger.warning("Readiness script not installed, falling back to readyState: %s", str(e))
+
+    def wait(self, driver, container_selector=None, max_wait=None):
+        """
+        等待頁面就緒 Wait until page is ready
+
+        Args:
+            driver: WebDriver實例
+            container_selector (str): 需已渲染的資料容器CSS選擇器 CSS selector of the data container
+            max_wait (float): 覆寫最長等待秒數 Override maximum wait
+
+        Returns:
+            float: 實際等待秒數 Seconds actually waited
+        """
+        limit = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        try:
+            WebDriverWait(driver, limit, poll_frequency=self.poll_interval).until(
+                lambda d: d.execute_script(READY_CHECK_SCRIPT, container_selector, self.idle_ms)
+            )
+        except TimeoutException:
+            # 達上限仍繼續流程，與原本固定等待行為一致 Proceed at the cap, like the old fixed sleep
+            logger.warning("Page not idle after %.1fs (container: %s), continuing", limit, container_selector)
+        return time.monotonic() - start
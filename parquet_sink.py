@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet分區匯出 Partitioned Parquet Export
+將基本資料、營收資訊、財報資訊寫成有型別的Parquet資料集，依表與年/月或報表分區，
+每次寫入新增檔案（增量附加），以固定列數的row group串流寫出，查詢時可用分區與統計值做謂詞下推
+"""
+
+import os
+import time
+import uuid
+import logging
+import pandas as pd
+
+from metrics import METRICS
+from rdb_loader import TABLE_KEYS
+from frame_builder import REVENUE_TABLE_COLUMNS, REVENUE_DTYPES, REPORT_TABLE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 資料集目錄名稱 Dataset directory per table
+DATASET_NAMES = {
+    "basic": "basic_info",
+    "revenue": "revenue",
+    "report": "financial_report",
+}
+
+# 分區欄位與Arrow型別 Partition columns and their Arrow types per table
+PARTITIONS = {
+    "basic": [],
+    "revenue": [("年份", "int16"), ("月份", "int8")],
+    "report": [("報表", "string")],
+}
+
+# 寫入時間欄位，同鍵值多個版本時取最新 Load timestamp; readers keep the newest version per key
+LOADED_AT = "_loaded_at"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        raise Exception("Parquet匯出需要安裝pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def schema(kind):
+    """
+    各表固定的Arrow schema；基本資料欄位依回應而定，一律為字串，回傳None
+    Fixed Arrow schema per table; basic info columns follow the payload and are all strings, so None
+    """
+    pa = _pyarrow()
+    if kind == "revenue":
+        types = {"Int8": pa.int8(), "Int16": pa.int16(), "Int64": pa.int64(), "Float64": pa.float64()}
+        fields = [(column, types[REVENUE_DTYPES[column]] if column in REVENUE_DTYPES else pa.string())
+                  for column in REVENUE_TABLE_COLUMNS]
+    elif kind == "report":
+        fields = [(column, pa.float64() if column == "金額" else pa.string()) for column in REPORT_TABLE_COLUMNS]
+    else:
+        return None
+    return pa.schema(fields + [(LOADED_AT, pa.timestamp("us", tz="UTC"))])
+
+
+class ParquetSink:
+    """
+    Parquet資料集寫入器 Parquet dataset writer
+    介面與RDBLoader相同（load_all／load），可並用或互換
+    Same interface as RDBLoader (load_all / load), so the two can run side by side or be swapped
+    """
+
+    def __init__(self, root="./parquet", row_group_size=64 * 1024, max_rows_per_file=1024 * 1024,
+                 compression="zstd"):
+        """
+        初始化寫入器 Initialize sink
+
+        Args:
+            root (str): 資料集根目錄 Root directory of the datasets
+            row_group_size (int): 每個row group列數，也是每次轉換的批量 Rows per row group and per converted batch
+            max_rows_per_file (int): 每個檔案最多列數 Rows per file cap
+            compression (str): 壓縮方式 Parquet compression codec
+        """
+        self.root = root
+        self.row_group_size = row_group_size
+        self.max_rows_per_file = max(max_rows_per_file, row_group_size)
+        self.compression = compression
+
+    def load_all(self, df_basic_info, df_revenue_info, df_report_info):
+        """
+        寫入三張表 Write the three tables
+
+        Returns:
+            dict: 各表寫入列數 Rows written per table
+        """
+        return {
+            "basic": self.load("basic", df_basic_info),
+            "revenue": self.load("revenue", df_revenue_info),
+            "report": self.load("report", df_report_info),
+        }
+
+    def load(self, kind, df):
+        """
+        附加寫入單一表 Append one table
+
+        Args:
+            kind (str): basic / revenue / report
+            df (DataFrame): 要寫入的資料 Rows to write
+
+        Returns:
+            int: 寫入列數 Rows written
+        """
+        if df.empty:
+            return 0
+        pa = _pyarrow()
+        ds = pa.dataset
+
+        table = self._to_arrow(kind, df)
+        # 每次寫入使用唯一檔名，不覆寫先前的檔案 A unique basename per write never replaces earlier files
+        basename = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}-{{i}}.parquet"
+        with METRICS.timer("parquet_write", table=kind):
+            ds.write_dataset(
+                # 以row group大小的批次串流寫出 Stream batches of one row group each
+                pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=self.row_group_size)),
+                os.path.join(self.root, DATASET_NAMES[kind]),
+                format="parquet",
+                partitioning=self._partitioning(kind),
+                basename_template=basename,
+                existing_data_behavior="overwrite_or_ignore",
+                file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+                min_rows_per_group=min(self.row_group_size, len(df)),
+                max_rows_per_group=self.row_group_size,
+                max_rows_per_file=self.max_rows_per_file,
+            )
+        METRICS.inc("parquet_rows", len(df), table=kind)
+        logger.info("Wrote %d rows to %s", len(df), DATASET_NAMES[kind])
+        return len(df)
+
+    def dataset(self, kind):
+        """
+        取得可查詢的資料集 Open a dataset for querying
+
+        Returns:
+            pyarrow.dataset.Dataset: to_table(filter=...) 會依分區與row group統計值略過不需要的檔案
+                                     to_table(filter=...) prunes partitions and row groups
+        """
+        pa = _pyarrow()
+        path = os.path.join(self.root, DATASET_NAMES[kind])
+        fixed = schema(kind)
+        if fixed is None:
+            # 基本資料：合併所有檔案的欄位，避免只採用第一個檔案的schema Basic info: union of every file's columns
+            discovered = pa.dataset.dataset(path, format="parquet")
+            fixed = pa.unify_schemas([fragment.physical_schema for fragment in discovered.get_fragments()])
+        return pa.dataset.dataset(path, schema=fixed, format="parquet", partitioning=self._partitioning(kind))
+
+    def read(self, kind, filter=None, columns=None, latest=True):
+        """
+        讀取資料為DataFrame Read rows into a DataFrame
+
+        Args:
+            kind (str): basic / revenue / report
+            filter: pyarrow.compute 條件，例如 pc.field("年份") == 113 Predicate pushed down to the scan
+            columns (list): 要讀取的欄位 Columns to read
+            latest (bool): 同鍵值只保留最新寫入的一列 Keep only the newest row per key
+
+        Returns:
+            DataFrame
+        """
+        table = self.dataset(kind).to_table(filter=filter, columns=columns)
+        df = table.to_pandas()
+        keys = [key for key in TABLE_KEYS[kind] if key in df.columns]
+        if latest and keys and LOADED_AT in df.columns:
+            df = df.sort_values(LOADED_AT, kind="stable").drop_duplicates(subset=keys, keep="last")
+        return df.reset_index(drop=True)
+
+    def _to_arrow(self, kind, df):
+        """
+        轉為Arrow表並套用固定schema，每個檔案型別一致
+        Convert to Arrow and cast to the fixed schema, so every file has the same types
+        """
+        pa = _pyarrow()
+        df = df.copy()
+        df[LOADED_AT] = pd.Timestamp.now(tz="UTC")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fixed = schema(kind)
+        if fixed is None:
+            # 文字欄一律為string，全空欄也不會推斷出其他型別 Every column is a string, even when all null
+            fixed = pa.schema([(name, pa.string()) for name in table.column_names if name != LOADED_AT]
+                              + [(LOADED_AT, pa.timestamp("us", tz="UTC"))])
+        return table.select(fixed.names).cast(fixed)
+
+    def _partitioning(self, kind):
+        """
+        Hive式分區（年份=113/月份=7），寫入與讀取使用相同型別 Hive-style partitioning, same types for write and read
+        """
+        if not PARTITIONS[kind]:
+            return None
+        pa = _pyarrow()
+        schema = pa.schema([(column, pa.type_for_alias(alias)) for column, alias in PARTITIONS[kind]])
+        return pa.dataset.partitioning(schema, flavor="hive")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF文字比對 PDF Text Equivalence
+確認lean設定檔產生的PDF與完整瀏覽器內容一致：兩者文字正規化後比較相似度
+"""
+
+import os
+import re
+import difflib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 視為一致的最低相似度 Minimum similarity counted as equivalent
+DEFAULT_THRESHOLD = 0.99
+
+
+def extract_text(pdf_path):
+    """
+    擷取PDF全部文字 Extract all text from a PDF
+    需安裝 pypdf Requires pypdf
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise Exception("PDF文字比對需要安裝pypdf: pip install pypdf")
+    reader = PdfReader(pdf_path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def normalize(text):
+    """
+    正規化文字：移除空白差異 Normalize text so layout whitespace does not matter
+    """
+    return re.sub(r"\s+", "", text)
+
+
+def compare_pdfs(pdf_a, pdf_b, threshold=DEFAULT_THRESHOLD):
+    """
+    比較兩份PDF文字 Compare the text of two PDFs
+
+    Returns:
+        tuple: (是否一致 equivalent, 相似度 similarity ratio)
+    """
+    text_a = normalize(extract_text(pdf_a))
+    text_b = normalize(extract_text(pdf_b))
+    if text_a == text_b:
+        return True, 1.0
+    ratio = difflib.SequenceMatcher(None, text_a, text_b, autojunk=False).ratio()
+    return ratio >= threshold, ratio
+
+
+def compare_profiles(company_ids, download_path="./profile_check", threshold=DEFAULT_THRESHOLD, **crawler_kwargs):
+    """
+    以full與lean設定檔各爬一次並比對各欄位PDF Crawl with both profiles and compare every section
+
+    Args:
+        company_ids (list): 抽樣股票代碼 Sample company IDs
+        download_path (str): 輸出目錄，兩個設定檔各自一個子目錄 Output directory, one subdirectory per profile
+        threshold (float): 相似度門檻 Similarity threshold
+        crawler_kwargs: 其他StockPDFCrawler參數 Other StockPDFCrawler arguments
+
+    Returns:
+        list: [{company_id, section, equivalent, ratio}]，缺少任一份PDF時 equivalent 為 None
+    """
+    from stock_pdf_crawler import StockPDFCrawler
+
+    paths = {}
+    for profile in ("full", "lean"):
+        with StockPDFCrawler(download_path=os.path.join(download_path, profile), profile=profile,
+                             **crawler_kwargs) as crawler:
+            for company_id in company_ids:
+                crawler.crawl_stock_pdf(company_id)
+                for section, pdf_path in crawler.last_pdf_paths.items():
+                    paths[(profile, company_id, section)] = pdf_path
+
+    report = []
+    for (profile, company_id, section), full_path in sorted(paths.items()):
+        if profile != "full":
+            continue
+        lean_path = paths.get(("lean", company_id, section))
+        if lean_path is None:
+            report.append({"company_id": company_id, "section": section, "equivalent": None, "ratio": None})
+            continue
+        equivalent, ratio = compare_pdfs(full_path, lean_path, threshold)
+        report.append({"company_id": company_id, "section": section, "equivalent": equivalent, "ratio": ratio})
+        if not equivalent:
+            logger.warning("Lean PDF differs for company_id %s section %s (similarity %.3f)",
+                           company_id, section, ratio)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    for row in compare_profiles(["2330", "2454"]):
+        print(row)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API直出PDF渲染 API PDF Renderer
+不開瀏覽器，直接以 t146sb05 JSON 套用HTML模板並轉成PDF
+"""
+
+import html
+import logging
+from string import Template
+
+from mops_api import MopsClient, InvalidCompanyError, REVENUE_COLUMNS, REPORT_ITEMS
+
+logger = logging.getLogger(__name__)
+
+# 財報資訊各項目標題 Financial report item headings
+REPORT_ITEM_NAMES = {
+    'CAL': '資產負債表 Balance Sheet',
+    'CCSI': '綜合損益表 Income Statement',
+    'CCFS': '現金流量表 Cash Flow Statement',
+}
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+  @page { size: A4; margin: 0.4in; }
+  body { font-family: "Noto Sans CJK TC", "PingFang TC", "Microsoft JhengHei", sans-serif; font-size: 10pt; }
+  h1 { font-size: 14pt; margin: 0 0 8pt; }
+  h2 { font-size: 12pt; margin: 12pt 0 6pt; }
+  table { width: 100%; border-collapse: collapse; margin-bottom: 8pt; }
+  th, td { border: 1px solid #999; padding: 3pt 5pt; }
+  th { background: #e8eef8; }
+  td.num { text-align: right; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+$body
+</body>
+</html>
+""")
+
+
+def _cell(value):
+    """
+    轉為HTML儲存格內容 Escape a value for an HTML cell
+    """
+    return html.escape("" if value is None else str(value))
+
+
+def _table(headers, rows, numeric_from=None):
+    """
+    產生HTML表格 Build an HTML table
+
+    Args:
+        headers (list): 欄位名稱
+        rows (list): 資料列
+        numeric_from (int): 從第幾欄開始靠右對齊 First right-aligned column index
+    """
+    head = "".join(f"<th>{_cell(h)}</th>" for h in headers)
+    body = []
+    for row in rows:
+        cells = []
+        for index, value in enumerate(row):
+            css = ' class="num"' if numeric_from is not None and index >= numeric_from else ""
+            cells.append(f"<td{css}>{_cell(value)}</td>")
+        body.append("<tr>" + "".join(cells) + "</tr>")
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(body)}</tbody></table>"
+
+
+def html_to_pdf(document, pdf_path):
+    """
+    以本機HTML轉PDF引擎輸出 Render HTML to PDF with a local engine
+    需安裝 weasyprint Requires weasyprint
+    """
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise Exception("API渲染後端需要安裝weasyprint: pip install weasyprint")
+    HTML(string=document).write_pdf(pdf_path)
+
+
+class ApiPdfRenderer:
+    """
+    API渲染後端 API rendering backend
+    由JSON資料產生基本資料、營收資訊、財報資訊三份PDF
+    """
+
+    def __init__(self, client=None, renderer=html_to_pdf):
+        """
+        初始化渲染器 Initialize renderer
+
+        Args:
+            client (MopsClient): API用戶端 API client
+            renderer: HTML轉PDF函數 (html, pdf_path) Callable rendering HTML to a PDF file
+        """
+        self.client = client or MopsClient()
+        self.renderer = renderer
+        self._builders = {
+            "basic": self._basic_html,
+            "revenue": self._revenue_html,
+            "financial": self._financial_html,
+        }
+
+    def fetch(self, company_id, sections, info=None):
+        """
+        取得渲染所需的JSON資料 Fetch the JSON needed for the requested sections
+
+        Args:
+            company_id (str): 股票代碼
+            sections (list): 欄位資訊字典列表
+            info (dict): 已取得的t146sb05資料，None則重新請求 Already fetched t146sb05 result
+
+        Returns:
+            dict or None: t146sb05 result，營收明細存於 revenue_rows；代碼無效則None
+        """
+        if info is None:
+            try:
+                info = self.client.fetch_company_info(company_id)
+            except InvalidCompanyError:
+                logger.error("Invalid company_id: %s", company_id)
+                return None
+
+        # 已取得的營收明細不重複請求 Revenue rows fetched earlier are reused
+        if any(section["filename_suffix"] == "revenue" for section in sections) and 'revenue_rows' not in info:
+            api_name = info['revenue_information']['moreInfoUrl']['apiName']
+            info['revenue_rows'] = self.client.fetch_revenue(company_id, api_name)
+        return info
+
+    def section_data(self, section, info):
+        """
+        欄位PDF實際使用的資料，用於計算指紋 The data a section's PDF is rendered from, for fingerprinting
+
+        Args:
+            section (dict): 欄位資訊字典
+            info (dict): fetch() 取得的資料
+
+        Returns:
+            營收為完整營收明細，其他為t146sb05中的欄位 Full revenue rows for revenue, else the t146sb05 part
+        """
+        if section["filename_suffix"] == "revenue":
+            return info.get('revenue_rows')
+        return info.get(section["class"])
+
+    def render_section(self, company_id, section, info, pdf_path):
+        """
+        輸出單一欄位PDF Render one section to PDF
+
+        Args:
+            company_id (str): 股票代碼
+            section (dict): 欄位資訊字典
+            info (dict): fetch() 取得的資料
+            pdf_path (str): 輸出路徑 Output path
+        """
+        title = f"{company_id} {section['name']}"
+        body = self._builders[section["filename_suffix"]](info)
+        self.renderer(PAGE_TEMPLATE.substitute(title=_cell(title), body=body), pdf_path)
+
+    def _basic_html(self, info):
+        """
+        基本資料：欄位與值兩欄表格 Basic info as a key/value table
+        """
+        rows = list(info['basic_info'].items())
+        return _table(["項目", "內容"], rows)
+
+    def _revenue_html(self, info):
+        """
+        營收資訊：每月一列 Revenue, one row per month
+        """
+        return _table(REVENUE_COLUMNS, info['revenue_rows'], numeric_from=2)
+
+    def _financial_html(self, info):
+        """
+        財報資訊：CAL/CCSI/CCFS各一張表 Financial report, one table per item
+        """
+        report = info['financial_report_information']
+        headers = [title['main'] for title in report['titles']]
+        headers[0] = "項目"
+        parts = []
+        for item in REPORT_ITEMS:
+            parts.append(f"<h2>{_cell(REPORT_ITEM_NAMES[item])}</h2>")
+            parts.append(_table(headers, report.get(item, []), numeric_from=1))
+        return "\n".join(parts)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+內容定址PDF儲存庫 Content-addressed PDF Store
+PDF以內容雜湊存放，索引記錄 (公司, 欄位, 日期) 對應的雜湊與資料指紋，未變動的欄位可跳過渲染
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import date
+
+from db_utils import sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_index (
+    company_id  TEXT NOT NULL,
+    section     TEXT NOT NULL,
+    crawl_date  TEXT NOT NULL,
+    pdf_hash    TEXT NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (company_id, section, crawl_date)
+)
+"""
+
+
+def fingerprint(data):
+    """
+    計算JSON資料指紋 Fingerprint JSON data
+    鍵排序後取SHA-256，欄位順序不影響結果 SHA-256 over key-sorted JSON
+
+    Args:
+        data: 可轉JSON的資料 JSON-serialisable data
+
+    Returns:
+        str: 十六進位雜湊 Hex digest
+    """
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PdfStore:
+    """
+    PDF儲存庫 PDF store
+    blobs/<前兩碼>/<sha256>.pdf 存放內容，index.sqlite3 存放索引
+    每次操作各自開啟連線，多個worker程序可共用同一個儲存庫
+    """
+
+    def __init__(self, root="./pdf_store"):
+        """
+        初始化儲存庫 Initialize store
+
+        Args:
+            root (str): 儲存庫根目錄 Store root directory
+        """
+        self.root = os.path.abspath(root)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.index_path = os.path.join(self.root, "index.sqlite3")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with sqlite_connection(self.index_path) as conn:
+            conn.execute(SCHEMA)
+
+    def latest(self, company_id, section):
+        """
+        取得最近一次紀錄 Latest index entry
+
+        Returns:
+            dict or None: crawl_date, pdf_hash, fingerprint
+        """
+        with sqlite_connection(self.index_path) as conn:
+            row = conn.execute(
+                "SELECT crawl_date, pdf_hash, fingerprint FROM pdf_index "
+                "WHERE company_id = ? AND section = ? ORDER BY crawl_date DESC LIMIT 1",
+                (company_id, section),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"crawl_date": row[0], "pdf_hash": row[1], "fingerprint": row[2]}
+
+    def is_unchanged(self, company_id, section, data_fingerprint):
+        """
+        資料指紋是否與上次相同 Whether the data fingerprint matches the last run
+        """
+        if not data_fingerprint:
+            return False
+        entry = self.latest(company_id, section)
+        return bool(entry and entry["fingerprint"] == data_fingerprint
+                    and os.path.exists(self.blob_path(entry["pdf_hash"])))
+
+    def put_file(self, pdf_path, company_id, section, data_fingerprint=None, crawl_date=None):
+        """
+        將PDF移入儲存庫並更新索引 Move a PDF into the store and index it
+        內容相同的PDF只保留一份 Identical documents are stored once
+
+        Args:
+            pdf_path (str): 已產生的PDF檔 Rendered PDF file, moved into the store
+            company_id (str): 股票代碼
+            section (str): 欄位代號 Section suffix, e.g. basic
+            data_fingerprint (str): 來源資料指紋 Source data fingerprint
+            crawl_date (str): 日期，預設今天 ISO date, defaults to today
+
+        Returns:
+            str: 儲存庫中的檔案路徑 Path of the stored blob
+        """
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        pdf_hash = digest.hexdigest()
+
+        blob_path = self.blob_path(pdf_hash)
+        if os.path.exists(blob_path):
+            os.remove(pdf_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            shutil.move(pdf_path, blob_path)
+
+        with sqlite_connection(self.index_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pdf_index (company_id, section, crawl_date, pdf_hash, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (company_id, section, crawl_date or date.today().isoformat(), pdf_hash, data_fingerprint),
+            )
+        logger.info("Stored %s/%s as %s", company_id, section, pdf_hash[:12])
+        return blob_path
+
+    def blob_path(self, pdf_hash):
+        """
+        雜湊對應的檔案路徑 Blob path for a hash
+        """
+        return os.path.join(self.blob_dir, pdf_hash[:2], f"{pdf_hash}.pdf")
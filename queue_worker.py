@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+佇列worker Queue Worker
+從共用工作佇列租用公司，依序執行PDF爬取與資料寫入兩條流程；增加機器即可水平擴充
+"""
+
+import os
+import time
+import sqlite3
+import logging
+# import pyodbc
+
+from mops_api import MopsClient, InvalidCompanyError
+from frame_builder import FrameBuilder
+from rdb_loader import RDBLoader
+from sync_state import IncrementalSync
+from http_cache import ResponseCache
+from company_validator import CompanyValidator
+from universe import UniverseLoader
+from work_queue import WorkQueue, default_worker_id
+from metrics import METRICS
+from rate_limiter import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class QueueWorker:
+    """
+    佇列worker Queue worker
+    每次租用一小批，PDF與資料都處理完、資料庫寫入並更新水位後才標記完成；
+    中途崩潰則租約逾期，由其他worker重新處理
+    Leases a small batch and only completes it after both pipelines ran and the data load committed;
+    a crash lets the leases expire so another worker picks the batch up
+    """
+
+    def __init__(self, queue, crawler=None, client=None, loader=None, sync=None, worker_id=None, batch_size=10,
+                 idle_sleep=30):
+        """
+        初始化worker Initialize worker
+
+        Args:
+            queue (WorkQueue): 共用工作佇列 Shared work queue
+            crawler (StockPDFCrawler): PDF爬蟲，None則不產生PDF PDF crawler, PDF pipeline skipped if None
+            client (MopsClient): API用戶端，資料流程使用 API client for the data pipeline
+            loader (RDBLoader): 資料庫載入器，None則不寫入資料 Loader, data pipeline skipped if None
+            sync (IncrementalSync): 增量同步水位 Incremental sync watermarks
+            worker_id (str): 租約持有者名稱 Lease owner name
+            batch_size (int): 每次租用家數，也是每次寫入資料庫的批量 Companies per lease and per data load
+            idle_sleep (float): 佇列暫時無工作時的等待秒數 Wait when nothing is leasable yet
+        """
+        self.queue = queue
+        self.crawler = crawler
+        self.client = client or MopsClient()
+        self.loader = loader
+        self.sync = sync
+        self.worker_id = worker_id or default_worker_id()
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+
+    def run(self):
+        """
+        持續處理直到佇列清空 Work until the queue is drained
+
+        Returns:
+            dict: 佇列各狀態數量 Final queue state counts
+        """
+        logger.info("Worker %s started", self.worker_id)
+        while True:
+            company_ids = self.queue.lease(self.worker_id, self.batch_size)
+            if not company_ids:
+                stats = self.queue.stats()
+                if stats["pending"] == 0 and stats["leased"] == 0:
+                    break
+                # 其他worker的租約尚未到期 Other workers still hold leases
+                time.sleep(self.idle_sleep)
+                continue
+            self.process_batch(company_ids)
+        stats = self.queue.stats()
+        logger.info("Worker %s finished: %s", self.worker_id, stats)
+        return stats
+
+    def process_batch(self, company_ids):
+        """
+        處理一批公司 Process one leased batch
+        """
+        errors = {}
+        invalid = set()
+
+        # 資料流程：平行請求API後一次寫入 Data pipeline: concurrent API requests, one load per batch
+        if self.loader is not None:
+            builder = FrameBuilder()
+            need_revenue = self.sync.needs_revenue if self.sync else None
+            for company_id, fetched, error in self.client.fetch_many(company_ids, need_revenue=need_revenue):
+                if isinstance(error, InvalidCompanyError):
+                    invalid.add(company_id)
+                elif error is not None:
+                    errors[company_id] = f"data: {error}"
+                elif self.sync:
+                    self.sync.apply(builder, company_id, *fetched)
+                else:
+                    builder.add_company(company_id, *fetched)
+            try:
+                self.loader.load_all(*builder.frames())
+                if self.sync:
+                    self.sync.commit()
+            except Exception as e:
+                logger.error("Data load failed for batch %s: %s", ", ".join(company_ids), str(e))
+                if self.sync:
+                    self.sync.discard()
+                for company_id in company_ids:
+                    errors.setdefault(company_id, f"load: {e}")
+
+        # PDF流程：資料流程已失敗的公司會整家重試，先不爬PDF，避免重試時重複爬取
+        # PDF pipeline; companies whose data step failed are retried whole, so their PDFs wait for the retry
+        if self.crawler is not None:
+            for company_id in company_ids:
+                if company_id in invalid or company_id in errors:
+                    continue
+                # PDF較慢，逐家延長租約 PDFs are slow, keep the leases alive
+                self.queue.extend(company_ids, self.worker_id)
+                if not self.crawler.crawl_stock_pdf(company_id):
+                    errors.setdefault(company_id, "pdf: crawl failed")
+
+        for company_id in company_ids:
+            if company_id in invalid:
+                self.queue.fail(company_id, self.worker_id, "invalid company id", retry=False)
+            elif company_id in errors:
+                self.queue.fail(company_id, self.worker_id, errors[company_id])
+            elif not self.queue.complete(company_id, self.worker_id):
+                logger.warning("Lease on company_id %s expired before completion", company_id)
+
+
+def seed_universe(queue, validator=None, markets=("listed", "otc")):
+    """
+    以全市場公司清單填入佇列 Fill the queue with the full market universe
+
+    Args:
+        queue (WorkQueue): 工作佇列
+        validator (CompanyValidator): 同時記為有效代碼，省去預先驗證請求 Also record the IDs as valid
+        markets (tuple): 市場 listed / otc
+
+    Returns:
+        int: 新加入數量 Companies added
+    """
+    company_ids = UniverseLoader().company_ids(markets)
+    if validator is not None:
+        validator.remember_many(company_ids, True)
+    return queue.enqueue(company_ids)
+
+
+QUEUE_NAME = "full_market"  ## 同名佇列的所有機器共同分擔
+RUN_PDF = True  ## 是否產生PDF
+RUN_DATA = True  ## 是否寫入資料庫
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    ## 本機使用SQLite；多台機器時佇列與資料庫改用共用的DB-API連線（例如pyodbc）
+    queue_cn = sqlite3.connect("work_queue.sqlite3", timeout=30)
+    # queue_cn = pyodbc.connect("DRIVER={MySQL ODBC 5.1 Driver}; SERVER=主機名稱;DATABASE=資料庫名稱; UID=帳號; PASSWORD=密碼;OPTION=4;")
+    queue = WorkQueue(queue_cn, QUEUE_NAME)
+
+    ## 自適應速率限制由資料與PDF兩條流程共用 One adaptive rate limit shared by the data and PDF pipelines
+    rate_limiter = AdaptiveRateLimiter(rate=2.0, burst=2, max_rate=10.0)
+    client = MopsClient(max_connections=8, rate_limiter=rate_limiter, cache=ResponseCache("mops_cache.sqlite3"))
+    validator = CompanyValidator(client)
+    if queue.stats() == {"pending": 0, "leased": 0, "done": 0, "failed": 0}:
+        seed_universe(queue, validator)
+
+    cn = sqlite3.connect("stock_data.db") if RUN_DATA else None
+    loader = RDBLoader(cn, batch_size=1000, create_tables=True) if RUN_DATA else None
+    sync = IncrementalSync("sync_state.sqlite3") if RUN_DATA else None
+
+    crawler = None
+    if RUN_PDF:
+        from stock_pdf_crawler import StockPDFCrawler
+        crawler = StockPDFCrawler(download_path="./pdfs", rate_limiter=rate_limiter)
+    try:
+        QueueWorker(queue, crawler=crawler, client=client, loader=loader, sync=sync).run()
+    finally:
+        if crawler:
+            crawler.close()
+        client.close()
+        if cn:
+            cn.close()
+        queue_cn.close()
+        METRICS.export("metrics", f"queue_worker_{os.getpid()}")
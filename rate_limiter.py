@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨程序請求速率限制 Cross-process Rate Limiter
+以令牌桶控制所有worker對公開資訊觀測站的總請求速率
+AdaptiveRateLimiter 依回應延遲、429/5xx與錯誤頁面以AIMD自動調整速率
+"""
+
+import time
+import multiprocessing
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    令牌桶速率限制器 Token-bucket rate limiter
+    狀態存放於共享記憶體，同一個實例傳給子程序後所有worker共用同一個預算
+    """
+
+    def __init__(self, rate=1.0, burst=1, context=None):
+        """
+        初始化限制器 Initialize limiter
+
+        Args:
+            rate (float): 每秒允許的請求數 Requests allowed per second
+            burst (int): 可累積的最大令牌數 Maximum tokens that can accumulate
+            context: multiprocessing context，None使用預設 Multiprocessing context
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        context = context or multiprocessing.get_context()
+        self.burst = burst
+        self._lock = context.Lock()
+        self._rate = context.Value('d', float(rate), lock=False)
+        self._tokens = context.Value('d', float(burst), lock=False)
+        self._updated = context.Value('d', time.monotonic(), lock=False)
+        # 伺服器要求暫停到此時間 Paused until this time, e.g. after Retry-After
+        self._paused_until = context.Value('d', 0.0, lock=False)
+
+    @property
+    def rate(self):
+        """
+        目前速率（所有程序共用） Current rate, shared by every process
+        """
+        return self._rate.value
+
+    def acquire(self):
+        """
+        取得一個令牌，必要時等待 Take one token, waiting if necessary
+
+        Returns:
+            float: 等待秒數 Seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self._rate.value
+                tokens = min(self.burst, self._tokens.value + (now - self._updated.value) * rate)
+                self._updated.value = now
+                if now < self._paused_until.value:
+                    self._tokens.value = tokens
+                    delay = self._paused_until.value - now
+                elif tokens >= 1:
+                    self._tokens.value = tokens - 1
+                    return waited
+                else:
+                    self._tokens.value = tokens
+                    delay = (1 - tokens) / rate
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, latency=None, throttled=False, retry_after=None):
+        """
+        回報請求結果；固定速率時不調整 Report a request outcome; a fixed-rate limiter ignores it
+
+        Args:
+            latency (float): 回應秒數 Response time in seconds
+            throttled (bool): 被限流（429、5xx、錯誤頁面、逾時） Throttled: 429, 5xx, error page or timeout
+            retry_after (float): 伺服器要求等待秒數 Seconds requested by Retry-After
+        """
+        if retry_after:
+            self._pause(retry_after)
+
+    def _pause(self, seconds):
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until.value:
+                self._paused_until.value = until
+                logger.warning("Server asked to pause for %.1fs", seconds)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    自適應速率限制器 Adaptive rate limiter
+    加法增、乘法減（AIMD）：健康回應逐步加速，限流或延遲過高時減半，並以冷卻時間避免同一波錯誤重複減速
+    Additive increase on healthy responses, multiplicative decrease on throttling or high latency;
+    a cooldown keeps one burst of concurrent errors from cutting the rate repeatedly
+    """
+
+    def __init__(self, rate=1.0, burst=1, context=None, min_rate=0.2, max_rate=10.0, increase=0.05,
+                 decrease=0.5, target_latency=2.0, cooldown=5.0):
+        """
+        初始化限制器 Initialize limiter
+
+        Args:
+            rate (float): 起始速率 Starting requests per second
+            burst (int): 可累積的最大令牌數 Maximum tokens that can accumulate
+            context: multiprocessing context
+            min_rate (float): 速率下限 Rate floor
+            max_rate (float): 速率上限 Rate ceiling
+            increase (float): 每次健康回應增加的速率 Rate added per healthy response
+            decrease (float): 限流時速率乘數 Rate multiplier on throttling
+            target_latency (float): 超過此回應秒數視為伺服器吃緊 Latency above this counts as pressure
+            cooldown (float): 兩次減速的最短間隔秒數 Minimum seconds between decreases
+        """
+        super().__init__(rate, burst, context)
+        context = context or multiprocessing.get_context()
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+        self._last_decrease = context.Value('d', 0.0, lock=False)
+
+    def record(self, latency=None, throttled=False, retry_after=None):
+        """
+        依請求結果調整速率 Adjust the rate from a request outcome
+        """
+        if retry_after:
+            self._pause(retry_after)
+        slow = latency is not None and latency > self.target_latency
+        with self._lock:
+            rate = self._rate.value
+            if throttled or slow:
+                now = time.monotonic()
+                if now - self._last_decrease.value < self.cooldown:
+                    return
+                self._last_decrease.value = now
+                new_rate = max(self.min_rate, rate * self.decrease)
+            else:
+                new_rate = min(self.max_rate, rate + self.increase)
+            self._rate.value = new_rate
+        if throttled or slow:
+            logger.warning("Rate lowered to %.2f/s (%s)", new_rate,
+                           "throttled" if throttled else f"latency {latency:.2f}s")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+關聯式資料庫批次載入 RDB Bulk Loader
+以參數化executemany分批寫入三張表，每批一個交易，依鍵值冪等upsert
+適用SQLite與任何DB-API驅動（pyodbc、pymysql、psycopg2等）
+"""
+
+import logging
+import pandas as pd
+
+from metrics import METRICS
+from db_utils import detect_paramstyle
+
+logger = logging.getLogger(__name__)
+
+# 預設表名 Default table names
+TABLE_NAMES = {
+    "basic": "table_name1",
+    "revenue": "table_name2",
+    "report": "table_name3",
+}
+
+# upsert鍵值 Upsert keys per table
+TABLE_KEYS = {
+    "basic": ["股票代碼"],
+    "revenue": ["股票代碼", "年份", "月份"],
+    "report": ["股票代碼", "報表", "項目", "期間"],
+}
+
+
+def _sql_type(dtype):
+    """
+    pandas型別對應SQL型別 Map a pandas dtype to a SQL column type
+    """
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+class RDBLoader:
+    """
+    批次載入器 Bulk loader
+    先刪除同鍵值的舊資料再插入，兩者在同一個交易內，重跑結果不變
+    Deletes rows with the same keys, then inserts, inside one transaction per batch, so reruns are idempotent
+    """
+
+    def __init__(self, connection, batch_size=1000, tables=None, paramstyle=None, quote='"',
+                 create_tables=False):
+        """
+        初始化載入器 Initialize loader
+
+        Args:
+            connection: DB-API連線 DB-API connection
+            batch_size (int): 每批列數 Rows per batch/transaction
+            tables (dict): 表名對照，預設TABLE_NAMES Table name mapping
+            paramstyle (str): 參數樣式，None則由驅動模組判斷 qmark/numeric/format/pyformat
+            quote (str): 識別字引號，MySQL請用` Identifier quote, use ` for MySQL
+            create_tables (bool): 表不存在時建立（本機SQLite用） Create missing tables, for local SQLite
+        """
+        self.connection = connection
+        self.batch_size = batch_size
+        self.tables = dict(TABLE_NAMES, **(tables or {}))
+        self.paramstyle = paramstyle or detect_paramstyle(connection)
+        self.quote = quote
+        self.create_tables = create_tables
+        # create_tables時已知的各表欄位 Known columns per table when create_tables is set
+        self._columns = {}
+
+    def load_all(self, df_basic_info, df_revenue_info, df_report_info):
+        """
+        載入三張表 Load the three tables
+
+        Returns:
+            dict: 各表寫入列數 Rows written per table
+        """
+        return {
+            "basic": self.load("basic", df_basic_info),
+            "revenue": self.load("revenue", df_revenue_info),
+            "report": self.load("report", df_report_info),
+        }
+
+    def load(self, kind, df):
+        """
+        載入單一表 Load one table
+
+        Args:
+            kind (str): basic / revenue / report
+            df (DataFrame): 要寫入的資料 Rows to write
+
+        Returns:
+            int: 寫入列數 Rows written
+        """
+        if df.empty:
+            return 0
+        table = self.tables[kind]
+        keys = [key for key in TABLE_KEYS[kind] if key in df.columns]
+        if keys:
+            # 同一批內同鍵值只保留最後一列 Keep the last row per key within the load
+            deduped = df.drop_duplicates(subset=keys, keep="last")
+            if len(deduped) < len(df):
+                logger.warning("Dropped %d duplicate-key rows for %s", len(df) - len(deduped), table)
+            df = deduped
+        if self.create_tables:
+            self._create_table(table, df, keys)
+
+        columns = list(df.columns)
+        insert_sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            self._ident(table),
+            ", ".join(self._ident(column) for column in columns),
+            ", ".join(self._placeholder(index) for index in range(len(columns))),
+        )
+        delete_sql = "DELETE FROM {} WHERE {}".format(
+            self._ident(table),
+            " AND ".join(f"{self._ident(key)} = {self._placeholder(index)}" for index, key in enumerate(keys)),
+        )
+
+        # 轉為Python原生值，NA轉為None Native Python values, NA becomes None
+        rows = df.astype(object).where(df.notna(), None).values.tolist()
+        key_indexes = [columns.index(key) for key in keys]
+
+        cursor = self.connection.cursor()
+        try:
+            with METRICS.timer("sql_load", table=kind):
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    try:
+                        if keys:
+                            cursor.executemany(delete_sql, [[row[i] for i in key_indexes] for row in batch])
+                        cursor.executemany(insert_sql, batch)
+                        self.connection.commit()
+                    except Exception:
+                        self.connection.rollback()
+                        raise
+        finally:
+            cursor.close()
+
+        METRICS.inc("sql_rows", len(rows), table=kind)
+        logger.info("Loaded %d rows into %s", len(rows), table)
+        return len(rows)
+
+    def _create_table(self, table, df, keys):
+        """
+        建立資料表，並補上表中沒有的欄位 Create table if missing and add columns it lacks
+        基本資料欄位依回應而定，後來的公司可能多出欄位 Basic info columns follow the payload, so later companies may add some
+        """
+        if table in self._columns and set(df.columns) <= self._columns[table]:
+            return
+        # 無參數執行，%不需跳脫 Executed without parameters, so % is not escaped
+        columns = [f"{self._ident(column, False)} {_sql_type(dtype)}" for column, dtype in df.dtypes.items()]
+        if keys:
+            columns.append("PRIMARY KEY ({})".format(", ".join(self._ident(key, False) for key in keys)))
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {self._ident(table, False)} ({', '.join(columns)})")
+            cursor.execute(f"SELECT * FROM {self._ident(table, False)} WHERE 1 = 0")
+            existing = {description[0] for description in cursor.description}
+            for column, dtype in df.dtypes.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {self._ident(table, False)} "
+                                   f"ADD COLUMN {self._ident(column, False)} {_sql_type(dtype)}")
+                    existing.add(column)
+                    logger.info("Added column %s to %s", column, table)
+            self.connection.commit()
+        finally:
+            cursor.close()
+        self._columns[table] = existing
+
+    def _ident(self, name, parameterized=True):
+        """
+        引號包住識別字（欄名含中文與括號） Quote an identifier; column names contain CJK and parentheses
+        """
+        name = str(name).replace(self.quote, self.quote * 2)
+        if parameterized and self.paramstyle in ("format", "pyformat"):
+            # %會被驅動視為參數 % would be taken as a parameter marker
+            name = name.replace("%", "%%")
+        return f"{self.quote}{name}{self.quote}"
+
+    def _placeholder(self, index):
+        """
+        依參數樣式產生佔位符 Placeholder for the driver's paramstyle
+        """
+        if self.paramstyle == "qmark":
+            return "?"
+        if self.paramstyle == "numeric":
+            return f":{index + 1}"
+        if self.paramstyle in ("format", "pyformat"):
+            return "%s"
+        raise ValueError(f"Unsupported paramstyle: {self.paramstyle}")
@@ -6,6 +6,9 @@
 """
 
 from stock_pdf_crawler import StockPDFCrawler
+from crawl_scheduler import CrawlScheduler
+from job_journal import JobJournal
+from metrics import METRICS
 import logging
 
 # 配置簡單日誌 Configure simple logging
@@ -13,20 +16,22 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def crawl_single_stock(company_id):
+def crawl_single_stock(company_id, crawler=None):
     """
     爬取單一股票資料 Crawl single stock data
     
     Args:
         company_id (str): 股票代碼 Stock company ID
+        crawler (StockPDFCrawler): 共用的爬蟲，None則建立一次性爬蟲 Shared crawler, one-off if None
     """
     logger.info("開始爬取股票代碼: %s", company_id)
     
-    # 初始化爬蟲 Initialize crawler
-    crawler = StockPDFCrawler(download_path="./pdfs")
-    
     # 執行爬取 Execute crawling
-    success = crawler.crawl_stock_pdf(company_id)
+    if crawler is None:
+        with StockPDFCrawler(download_path="./pdfs") as one_off_crawler:
+            success = one_off_crawler.crawl_stock_pdf(company_id)
+    else:
+        success = crawler.crawl_stock_pdf(company_id)
     
     if success:
         logger.info("成功完成股票 %s 的PDF下載", company_id)
@@ -36,28 +41,54 @@ def crawl_single_stock(company_id):
     return success
 
 
-def crawl_multiple_stocks(company_ids):
+def crawl_multiple_stocks(company_ids, workers=1, requests_per_second=1.0, max_requests_per_second=None,
+                          max_pages_per_driver=50,
+                          backend="selenium", store_path=None, http_cache_path=None,
+                          journal_path=None, job_id="default", retry_failed_only=False, metrics_dir="./metrics",
+                          parallel_sections=False, profile="full"):
     """
     批量爬取多支股票 Batch crawl multiple stocks
     
     Args:
         company_ids (list): 股票代碼列表 List of stock company IDs
+        workers (int): 平行瀏覽器worker數 Number of parallel browser workers
+        requests_per_second (float): 所有worker共用的請求速率上限 Global request rate shared by all workers
+        max_requests_per_second (float): 設定後依伺服器回應自動調整速率，最高到此值
+                                         Adapt the shared rate to server health, up to this ceiling
+        max_pages_per_driver (int): 每個瀏覽器處理幾家公司後回收 Companies per browser before recycling
+        backend (str): 渲染後端 "selenium" 或 "api" Rendering backend
+        store_path (str): 內容定址儲存庫目錄，設定後只重新產生有變動的欄位
+                          Content-addressed store; when set only changed sections are re-rendered
+        http_cache_path (str): API回應快取檔 On-disk MOPS API response cache
+        journal_path (str): 工作日誌檔，設定後中斷可續跑 Job journal; makes the run resumable
+        job_id (str): 工作名稱，同名重跑只執行未完成部分 Job name; rerunning it resumes unfinished work
+        retry_failed_only (bool): 只重試上次失敗的欄位 Only retry sections that failed last time
+        metrics_dir (str): 各階段耗時指標輸出目錄，None則不輸出 Per-phase metrics output directory, None to skip
+        parallel_sections (bool): 每家公司的三個欄位在各自分頁平行渲染 Render the three sections in parallel tabs
+        profile (str): 瀏覽器設定檔 "full" 或 "lean"，lean可在同一台主機執行更多worker
+                       Browser profile; "lean" fits more workers per host
     """
-    results = {}
-    
-    for company_id in company_ids:
-        logger.info("處理股票代碼: %s", company_id)
-        results[company_id] = crawl_single_stock(company_id)
-        
-        # 避免請求過於頻繁 Avoid too frequent requests
-        import time
-        time.sleep(3)
+    # 由排程器分派給各worker，速率限制取代固定等待 Scheduler fans out; the rate limit replaces fixed sleeps
+    scheduler = CrawlScheduler(workers=workers, requests_per_second=requests_per_second,
+                               max_requests_per_second=max_requests_per_second,
+                               download_path="./pdfs", max_pages_per_driver=max_pages_per_driver,
+                               backend=backend, store_path=store_path, http_cache_path=http_cache_path,
+                               parallel_sections=parallel_sections, profile=profile)
+    journal = JobJournal(journal_path, job_id) if journal_path else None
+    results = scheduler.run(company_ids, journal=journal, retry_failed_only=retry_failed_only)
     
     # 輸出結果摘要 Output results summary
     logger.info("=== 爬取結果摘要 Crawling Results Summary ===")
     for company_id, success in results.items():
         status = "成功" if success else "失敗"
         logger.info("股票 %s: %s", company_id, status)
+    if journal:
+        logger.info("工作 %s 欄位狀態 Section states: %s", job_id, journal.summary())
+    if metrics_dir:
+        prom_path, json_path = METRICS.export(metrics_dir, "stock_pdf_crawler")
+        logger.info("指標輸出 Metrics written to %s, %s", prom_path, json_path)
+    
+    return results
 
 
 if __name__ == "__main__":
@@ -72,7 +103,17 @@ if __name__ == "__main__":
         # 在這裡添加更多股票代碼 Add more stock IDs here
     # ]
     stock_list = ["2409","2330","0001","2454","2317","2308","2382","3034","2379","2303"]
-    crawl_multiple_stocks(stock_list)
+    crawl_multiple_stocks(stock_list, workers=2, max_requests_per_second=5.0)
+    # 可續跑：同一個job_id重跑只執行未完成的欄位，換新的job_id才會重新爬取
+    # Resumable: rerunning a job_id only runs unfinished sections; use a new job_id for a fresh crawl
+    # crawl_multiple_stocks(stock_list, workers=2, max_requests_per_second=5.0, journal_path="crawl_jobs.sqlite3",
+    #                       job_id="20240701")
+    
+    # 方式4：全部上市、上櫃公司 Method 4: Full market (listed + OTC)
+    # from universe import UniverseLoader
+    # crawl_multiple_stocks(UniverseLoader().company_ids(), workers=4, journal_path="crawl_jobs.sqlite3",
+    #                       job_id="full_market")
+    # 多台機器分擔請改用 queue_worker.py Use queue_worker.py to spread the crawl across machines
     
     # 方式3：互動式輸入 Method 3: Interactive input
     # while True:
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+選擇器學習快取 Learned Selector Cache
+記住每個欄位上次成功的選擇器，並在同一期限內一次探測所有候選選擇器
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".stock_crawler", "selector_cache.json")
+
+# 找到較後順位的選擇器時，再等較前順位者出現的秒數 Grace wait for higher-ranked selectors after a fallback matched
+DEFAULT_GRACE = 1.0
+
+# 一次往返檢查所有候選選擇器，回傳第一個可點擊元素的索引與元素
+# Checks every candidate in one round trip; returns index and element of the first clickable match
+PROBE_SCRIPT = """
+var selectors = arguments[0];
+for (var i = 0; i < selectors.length; i++) {
+  var el = null;
+  try {
+    if (selectors[i].charAt(0) === '/') {
+      el = document.evaluate(selectors[i], document, null,
+                             XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } else {
+      el = document.querySelector(selectors[i]);
+    }
+  } catch (e) { el = null; }
+  if (el && el.getClientRects().length > 0 && !el.disabled) { return [i, el]; }
+}
+return null;
+"""
+
+# 頁面標記指紋：SPA打包檔與樣式表網址，改版時會變動
+# Markup fingerprint: SPA bundle and stylesheet URLs, which change on redeploy
+FINGERPRINT_SCRIPT = """
+var parts = [];
+document.querySelectorAll('script[src], link[rel=stylesheet]').forEach(function (n) {
+  parts.push(n.getAttribute('src') || n.getAttribute('href'));
+});
+return parts.join('|');
+"""
+
+
+class SelectorCache:
+    """
+    選擇器快取 Selector cache
+    以JSON檔保存各鍵（例如 print:basic_info）上次成功的選擇器，網站標記指紋改變時自動清空
+    """
+
+    def __init__(self, cache_path=None, grace=DEFAULT_GRACE):
+        """
+        初始化快取 Initialize cache
+
+        Args:
+            cache_path: 快取檔案路徑 Path of the on-disk cache file
+            grace (float): 後備選擇器先出現時，再等較精確選擇器的秒數
+                           Extra wait for more specific selectors when a fallback renders first
+        """
+        self.cache_path = cache_path or os.environ.get("SELECTOR_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def check_fingerprint(self, driver):
+        """
+        比對網站標記指紋，不同則清空快取 Invalidate cache when the site markup changes
+
+        Args:
+            driver: 已載入頁面的WebDriver
+        """
+        try:
+            markup = driver.execute_script(FINGERPRINT_SCRIPT) or ""
+        except Exception as e:
+            logger.warning("Unable to fingerprint page markup: %s", str(e))
+            return
+        fingerprint = hashlib.sha1(markup.encode('utf-8')).hexdigest()[:16]
+
+        with self._lock:
+            if self._data.get("fingerprint") == fingerprint:
+                return
+            if self._data.get("winners"):
+                logger.info("Site markup changed (%s -> %s), selector cache cleared",
+                            self._data.get("fingerprint"), fingerprint)
+            self._data = {"fingerprint": fingerprint, "winners": {}}
+            self._save({})
+
+    def find(self, driver, key, selectors, deadline):
+        """
+        尋找可點擊元素 Find a clickable element
+        上次成功的選擇器排第一，所有候選在同一個期限內一起輪詢
+
+        Args:
+            driver: WebDriver實例
+            key (str): 快取鍵 Cache key
+            selectors (list): 候選選擇器，以/開頭者為XPath Candidate selectors, XPath if starting with /
+            deadline (float): 所有候選共用的等待秒數 Shared wait for all candidates
+
+        Returns:
+            WebElement or None: 找到的元素
+        """
+        winner = self._data["winners"].get(key)
+        ordered = list(selectors)
+        if winner in ordered:
+            ordered.remove(winner)
+            ordered.insert(0, winner)
+
+        start = time.monotonic()
+        try:
+            index, element = WebDriverWait(driver, deadline, poll_frequency=0.2).until(
+                lambda d: d.execute_script(PROBE_SCRIPT, ordered)
+            )
+        except TimeoutException:
+            logger.warning("No selector matched for %s within %.1fs", key, deadline)
+            return None
+        selector = ordered[index]
+
+        # 後備選擇器可能只是比精確選擇器先渲染，短暫再探測較前順位者，避免學到泛用選擇器
+        # A fallback may simply have rendered first; briefly re-probe the higher-ranked selectors
+        # so a generic match is not learned as the winner
+        rank = list(selectors).index(selector)
+        if selector != winner and rank > 0:
+            grace = min(self.grace, max(0.0, deadline - (time.monotonic() - start)))
+            better = list(selectors)[:rank]
+            try:
+                index, better_element = WebDriverWait(driver, grace, poll_frequency=0.2).until(
+                    lambda d: d.execute_script(PROBE_SCRIPT, better)
+                )
+                selector, element = better[index], better_element
+            except TimeoutException:
+                pass
+
+        logger.info("Element for %s found with selector: %s%s", key, selector,
+                    " (cached)" if selector == winner else "")
+        if selector != winner:
+            with self._lock:
+                self._data["winners"][key] = selector
+                self._save({key: selector})
+        return element
+
+    def _load(self):
+        """
+        讀取磁碟快取 Load on-disk cache
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            data.setdefault("winners", {})
+            return data
+        except (OSError, ValueError):
+            return {"fingerprint": None, "winners": {}}
+
+    def _save(self, winners):
+        """
+        合併後寫入磁碟快取 Merge with the file on disk, then persist atomically
+        多個worker共用同一個檔案：先重新讀取，標記指紋相同時只覆寫本次變動的鍵
+        Workers share one file: it is re-read first and, for the same markup fingerprint,
+        only the keys changed here are overwritten
+
+        Args:
+            winners (dict): 本次變動的鍵與選擇器 Keys changed by this call
+        """
+        disk = self._load()
+        if disk.get("fingerprint") == self._data.get("fingerprint"):
+            disk["winners"].update(winners)
+            self._data = disk
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._data, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -1,86 +1,80 @@
-import requests
-from bs4 import BeautifulSoup
-import ast
-import pandas as pd
-import time
+import sqlite3
 # import pyodbc
+from mops_api import MopsClient, InvalidCompanyError
+from frame_builder import FrameBuilder
+from rdb_loader import RDBLoader
+from parquet_sink import ParquetSink
+from sync_state import IncrementalSync
+from http_cache import ResponseCache
+from universe import UniverseLoader
+from metrics import METRICS
+from rate_limiter import AdaptiveRateLimiter
+
 
 stock_code_list = ["2409","2330","0001","2454","2317","2308","2382","3034","2379","2303"]
-for stock_code in stock_code_list:
-    url = 'https://mops.twse.com.tw/mops/api/t146sb05' ###
-    payload = {
-        "companyId": stock_code
-    }
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'Mozilla/5.0',
-        'Origin': 'https://mops.twse.com.tw',
-        'Referer': 'https://mops.twse.com.tw/mops/web/t146sb05',
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    if "公司代號格式錯誤" not in response.text:
-        output = ast.literal_eval(response.text)
-        
-        ####基本資料####
-        tmp = output['result']['basic_info'] ##基本資料
-        df_basic_info = pd.DataFrame(columns = tmp.keys())
-        df_basic_info = pd.concat([df_basic_info, pd.DataFrame([tmp])], axis=0, ignore_index=True)
-        # df_basic_info    
-        ##插入資料
-        # cn = pyodbc.connect("DRIVER={MySQL ODBC 5.1 Driver}; SERVER=主機名稱;DATABASE=資料庫名稱; UID=帳號; PASSWORD=密碼;OPTION=4;")
-        insert_table = "insert into table_name1 values " + ",".join("('" + "','".join(row.astype("str")) + "')"  for row in df_basic_info.values)
-        # print("基本資料:\n",insert_table)
-        # cn.execute(insert_table)
-        # cn.close
-        ###############
-        
-        ####營收資訊####
-        revenue_col_name = ['年份','月份','當月營收','去年當月營收','去年同月增減(%)','當月累計營收','去年累計營收','前期比較增減(%)','股票代碼']
-        df_revenue_info = pd.DataFrame(columns = revenue_col_name)
-        api_name = output['result']['revenue_information']['moreInfoUrl']['apiName'] ##財報資訊
-        url2 = f"https://mops.twse.com.tw/mops/api/{api_name}"
-        payload = {
-            "company_id": stock_code
-        }
-        res_revenue = requests.post(url2, json=payload, headers=headers)
-        output_revenue = ast.literal_eval(res_revenue.text)
-        INFOs = output_revenue['result']['data']
-        for info in INFOs:
-            new_row_df = pd.DataFrame([info + [stock_code]],columns = revenue_col_name)
-            df_revenue_info = pd.concat([df_revenue_info , new_row_df],ignore_index=True)
-        ##插入資料
-        # cn = pyodbc.connect("DRIVER={MySQL ODBC 5.1 Driver}; SERVER=主機名稱;DATABASE=資料庫名稱; UID=帳號; PASSWORD=密碼;OPTION=4;")
-        insert_table = "insert into table_name2 values " + ",".join("('" + "','".join(row.astype("str")) + "')"  for row in df_revenue_info.values)
-        # print("營收資訊:\n",insert_table)
-        # cn.execute(insert_table)
-        # cn.close
-        ###############
-        
-        ####財報資訊####
-        report_col_name = []
-        filt_data = output['result']['financial_report_information']['titles']
-        for data in filt_data:
-            report_col_name.append(data['main'])
-        report_col_name[0] = "項目"
-        report_col_name.insert(0,"股票代碼")
-        df_report_info = pd.DataFrame(columns = report_col_name)
-    
-        ITEMs = ['CAL','CCSI','CCFS']
-        for item in ITEMs:
-            contents = output['result']['financial_report_information'][item]
-            for content in contents:
-                content2 = [stock_code] + content
-                new_row_df = pd.DataFrame([content2],columns = report_col_name)
-                df_report_info = pd.concat([df_report_info,new_row_df], ignore_index=True)
-    
-        ##插入資料
-        # cn = pyodbc.connect("DRIVER={MySQL ODBC 5.1 Driver}; SERVER=主機名稱;DATABASE=資料庫名稱; UID=帳號; PASSWORD=密碼;OPTION=4;")
-        insert_table = "insert into table_name3 values " + ",".join("('" + "','".join(row.astype("str")) + "')"  for row in df_report_info.values)
-        # print("財報資訊:\n",insert_table)
-        # cn.execute(insert_table)
-        # cn.close
-        # print("="*70)
-        print(f"======股票代碼 {stock_code} 執行完成。======")
-    else:
-        print(f"======股票代碼 {stock_code} 發生異常。======")
-        time.sleep(0.2)
\ No newline at end of file
+LOAD_EVERY = 100  ## 每累積幾家公司寫入一次資料庫
+FULL_REFRESH = False  ## True則忽略水位重新載入全部
+FULL_MARKET = False  ## True則爬取全部上市、上櫃公司；多台機器分擔請改用 queue_worker.py
+PARQUET_DIR = None  ## 設定目錄則另外匯出依表與年/月、報表分區的Parquet資料集（需安裝pyarrow）
+
+
+def sync_stocks(client, sync, sinks, stock_codes, workers=8, load_every=LOAD_EVERY):
+    """
+    同步多家公司：平行請求、增量比對，每 load_every 家寫入一次
+    Sync many companies: concurrent fetch, incremental diff, one load per load_every companies
+
+    Returns:
+        int: 失敗家數 Number of companies that failed
+    """
+    builder = FrameBuilder()
+    pending = failed = 0
+    for stock_code, fetched, error in client.fetch_many(stock_codes, workers=workers, need_revenue=sync.needs_revenue):
+        if error is None:
+            output, revenue_rows = fetched
+            with METRICS.timer("sync_apply", company_id=stock_code):
+                added = sync.apply(builder, stock_code, output, revenue_rows)
+            pending += 1
+            if pending >= load_every:
+                frames = builder.frames()
+                for sink in sinks:
+                    sink.load_all(*frames)
+                sync.commit()
+                builder, pending = FrameBuilder(), 0
+            print(f"======股票代碼 {stock_code} 執行完成。新增營收 {added['revenue']} 筆======")
+        else:
+            failed += 1
+            if not isinstance(error, InvalidCompanyError):
+                print(f"股票代碼 {stock_code} 請求失敗: {error}")
+            print(f"======股票代碼 {stock_code} 發生異常。======")
+    if pending:
+        frames = builder.frames()
+        for sink in sinks:
+            sink.load_all(*frames)
+        sync.commit()
+    return failed
+
+if __name__ == "__main__":
+    if FULL_MARKET:
+        stock_code_list = UniverseLoader().company_ids()
+
+    ##插入資料：本機使用SQLite，正式環境改用DB-API驅動（例如pyodbc）
+    cn = sqlite3.connect("stock_data.db")
+    # cn = pyodbc.connect("DRIVER={MySQL ODBC 5.1 Driver}; SERVER=主機名稱;DATABASE=資料庫名稱; UID=帳號; PASSWORD=密碼;OPTION=4;")
+    # loader = RDBLoader(cn, batch_size=1000, quote='`')
+    loader = RDBLoader(cn, batch_size=1000, create_tables=True)
+    sinks = [loader] + ([ParquetSink(PARQUET_DIR)] if PARQUET_DIR else [])
+
+    ## 增量同步：只載入水位之後的營收與有變動的基本資料、財報
+    sync = IncrementalSync("sync_state.sqlite3", full_refresh=FULL_REFRESH)
+
+    ## 連線池 + 平行請求，t146sb05回應後立即接著請求營收明細（營收摘要證明沒有新月份則跳過）
+    ## 回應快取：有效期內重跑不發出網路請求
+    ## 自適應速率限制：回應健康時加速，429/5xx、錯誤頁面或延遲過高時減半
+    client = MopsClient(max_connections=8, cache=ResponseCache("mops_cache.sqlite3"),
+                        rate_limiter=AdaptiveRateLimiter(rate=2.0, burst=4, max_rate=10.0))
+    sync_stocks(client, sync, sinks, stock_code_list)
+    client.close()
+    cn.close()
+
+    ## 各階段耗時（HTTP、pandas、SQL）輸出為Prometheus文字檔與JSON摘要
+    METRICS.export("metrics", "stock_data_crawler")
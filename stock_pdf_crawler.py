@@ -7,6 +7,8 @@
 
 import os
 import time
+import base64
+import tempfile
 import logging
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -14,8 +16,19 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+from driver_pool import DriverPool
+from driver_resolver import ChromeDriverResolver
+from page_readiness import PageReadiness
+from selector_cache import SelectorCache
+from rate_limiter import AdaptiveRateLimiter
+from mops_api import MopsClient, InvalidCompanyError, is_throttle_page
+from http_cache import ResponseCache
+from pdf_renderer import ApiPdfRenderer
+from pdf_store import PdfStore, fingerprint
+from company_validator import CompanyValidator
+from metrics import METRICS
 
 # 配置日誌 Configure logging
 logging.basicConfig(
@@ -28,6 +41,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 要爬取的欄位 Sections to crawl
+SECTIONS = [
+    {"name": "基本資料", "class": "basic_info", "filename_suffix": "basic", "container": "table"},
+    {"name": "營收資訊", "class": "revenue_information", "filename_suffix": "revenue", "container": "table"},
+    {"name": "財報資訊", "class": "financial_report_information", "filename_suffix": "financial",
+     "container": "table"}
+]
+
+# 公開資訊觀測站網址，離線測試時可指向本機替身伺服器 MOPS site; point at the local stand-in for offline runs
+SITE_URL = "https://mops.twse.com.tw"
+
+# 可選的渲染後端 Available rendering backends
+BACKENDS = ("selenium", "api")
+
+# 瀏覽器設定檔：full為完整瀏覽器，lean為無頭且封鎖非必要資源
+# Browser profiles: "full" is the regular browser, "lean" is headless with non-essential resources blocked
+PROFILES = ("full", "lean")
+
+# lean設定檔封鎖的網址（圖片、影音、字型、分析追蹤） URLs blocked by the lean profile
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+]
+
+# lean設定檔的渲染程序JS記憶體上限（MB） JS heap cap per renderer for the lean profile, in MB
+LEAN_RENDERER_HEAP_MB = 512
+
 
 class StockPDFCrawler:
     """
@@ -35,24 +78,104 @@ class StockPDFCrawler:
     負責自動化瀏覽器操作，抓取股票資訊並保存為PDF
     """
     
-    def __init__(self, download_path="./downloads"):
+    def __init__(self, download_path="./downloads", driver_pool=None, pool_size=1, max_pages_per_driver=50,
+                 offline=None, rate_limiter=None, backend="selenium", store_path=None, http_cache_path=None,
+                 validate_ids=True, company_cache_path=None, parallel_sections=False, profile="full",
+                 site_url=SITE_URL):
         """
         初始化爬蟲 Initialize crawler
         Args:
             download_path: PDF檔案下載路徑 PDF download path
+            driver_pool: 共用的瀏覽器驅動池，None則自行建立 Shared DriverPool, created if None
+            pool_size: 自建驅動池的瀏覽器數量 Browsers in the owned pool
+            max_pages_per_driver: 每個瀏覽器處理幾家公司後回收 Companies per browser before recycling
+            offline: 離線模式，只使用已快取的ChromeDriver Use cached ChromeDriver only, no downloads
+            rate_limiter: 共用的請求速率限制器，None則不限制 Shared RateLimiter, unlimited if None
+            backend: 渲染後端 "selenium"（瀏覽器友善列印）或 "api"（JSON套模板）
+                     Rendering backend, "selenium" (browser print) or "api" (JSON through HTML templates)
+            store_path: 內容定址儲存庫目錄，設定後跳過資料未變動的欄位
+                        Content-addressed store directory; enables skipping unchanged sections
+            http_cache_path: API回應快取檔，API後端與指紋比對共用 Response cache for API backend and fingerprints
+            validate_ids: 啟動瀏覽器前先以API驗證代碼 Validate IDs through the API before using a browser
+            company_cache_path: 代碼驗證快取檔，None則使用預設路徑 Validation cache, default path if None
+            parallel_sections: 每個欄位開一個分頁平行渲染 Render each section in its own tab concurrently
+            profile: 瀏覽器設定檔 "full" 或 "lean"（無頭、封鎖圖片字型與追蹤、限制記憶體）
+                     Browser profile, "full" or "lean" (headless, blocked assets and trackers, memory cap)
+            site_url: 網站根網址 Site root URL, e.g. a local mops_stub server
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile}")
+        self.backend = backend
+        self.profile = profile
         self.download_path = os.path.abspath(download_path)
         self.driver = None
-        self.base_url = "https://mops.twse.com.tw/mops/#/web/t146sb05"
+        self.base_url = f"{site_url}/mops/#/web/t146sb05"
+        self.driver_resolver = ChromeDriverResolver(offline=offline)
+        self.rate_limiter = rate_limiter
+        
+        # API渲染後端 API rendering backend
+        http_cache = ResponseCache(http_cache_path) if http_cache_path else None
+        self.api_renderer = ApiPdfRenderer(MopsClient(base_url=f"{site_url}/mops/api", rate_limiter=rate_limiter,
+                                                      cache=http_cache))
+        
+        # 代碼預先驗證，已知無效者不佔用瀏覽器 Pre-validation; known-bad IDs never reach a browser
+        self.validator = CompanyValidator(self.api_renderer.client, company_cache_path) if validate_ids else None
+        
+        # 內容定址儲存庫 Content-addressed PDF store
+        self.store = PdfStore(store_path) if store_path else None
+        
+        # 頁面就緒判斷，取代固定等待 Readiness engine replacing fixed sleeps
+        self.readiness = PageReadiness()
+        self.last_wait_times = {}
+        
+        # 最近一次爬取各欄位是否成功，供工作日誌記錄 Per-section outcome of the last crawl, for the job journal
+        self.last_section_results = {}
+        # 最近一次爬取各欄位的PDF路徑 PDF path per section of the last crawl
+        self.last_pdf_paths = {}
+        
+        # 選擇器學習快取 Learned selector cache
+        self.selector_cache = SelectorCache()
+        self.selector_deadline = 10
+        
+        # 各欄位在各自分頁平行渲染 Render sections concurrently, one tab each
+        self.parallel_sections = parallel_sections
+        
+        # 串流擷取PDF，避免整份文件以base64存在記憶體 Stream PDFs to disk in chunks
+        self.stream_pdf = True
+        self.pdf_chunk_size = 1024 * 1024
+        
+        # 瀏覽器驅動池 Browser pool, reused across companies
+        self._owns_pool = driver_pool is None
+        self.driver_pool = driver_pool or DriverPool(
+            self._setup_driver, size=pool_size, max_pages=max_pages_per_driver
+        )
         
         # 確保下載目錄存在 Ensure download directory exists
         os.makedirs(self.download_path, exist_ok=True)
         logger.info("Download path initialized: %s", self.download_path)
     
+    def close(self):
+        """
+        關閉自建的瀏覽器驅動池 Close the owned driver pool
+        """
+        if self._owns_pool:
+            self.driver_pool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def _setup_driver(self):
         """
         設置Chrome瀏覽器驅動 Setup Chrome webdriver
         配置無頭模式和PDF打印設定
+        
+        Returns:
+            WebDriver: 新啟動的瀏覽器
         """
         chrome_options = Options()
         
@@ -62,6 +185,24 @@ class StockPDFCrawler:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         
+        # 背景分頁不降速，多分頁擷取時同時渲染 Keep background tabs at full speed for parallel capture
+        chrome_options.add_argument('--disable-background-timer-throttling')
+        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+        chrome_options.add_argument('--disable-renderer-backgrounding')
+        
+        # lean設定檔：無頭、關閉背景連線與擴充、限制記憶體 Lean profile: headless, no background traffic, capped memory
+        if self.profile == "lean":
+            chrome_options.add_argument('--headless=new')
+            chrome_options.add_argument('--disable-background-networking')
+            chrome_options.add_argument('--disable-extensions')
+            chrome_options.add_argument('--disable-component-update')
+            chrome_options.add_argument('--disable-sync')
+            chrome_options.add_argument('--disable-default-apps')
+            chrome_options.add_argument('--mute-audio')
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_argument(f'--js-flags=--max-old-space-size={LEAN_RENDERER_HEAP_MB}')
+            chrome_options.add_argument('--renderer-process-limit=2')
+        
         # PDF打印設定 PDF printing settings
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -85,42 +226,40 @@ class StockPDFCrawler:
         }
         chrome_options.add_experimental_option("prefs", prefs)
         
-        # 自動安裝ChromeDriver Auto install ChromeDriver
+        # 解析ChromeDriver（快取有效時不連網） Resolve ChromeDriver, no network on cache hit
         try:
-            # 嘗試使用WebDriverManager
-            driver_path = ChromeDriverManager().install()
-            
-            # 修復macOS ARM64上的路徑問題 Fix path issue on macOS ARM64
-            if 'THIRD_PARTY_NOTICES' in driver_path:
-                import os
-                driver_dir = os.path.dirname(driver_path)
-                # 尋找實際的chromedriver可執行文件 Find the actual chromedriver executable
-                for file in os.listdir(driver_dir):
-                    if file == 'chromedriver' or file.startswith('chromedriver') and not 'THIRD_PARTY' in file:
-                        driver_path = os.path.join(driver_dir, file)
-                        break
-                logger.info("Fixed ChromeDriver path: %s", driver_path)
-                
-                # 修復執行權限 Fix execute permissions
-                os.chmod(driver_path, 0o755)
-                logger.info("Set execute permissions: %s", driver_path)
+            with METRICS.timer("driver_resolve"):
+                driver_path = self.driver_resolver.resolve()
+            if not driver_path:
+                raise Exception("No ChromeDriver resolved")
             
             service = Service(driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            try:
+                with METRICS.timer("driver_start"):
+                    driver = webdriver.Chrome(service=service, options=chrome_options)
+            except Exception:
+                # 快取的驅動與Chrome不相容則清除快取 Drop a stale cache entry
+                self.driver_resolver.invalidate()
+                raise
             
         except Exception as e:
-            logger.error("WebDriverManager failed: %s", str(e))
+            logger.error("ChromeDriver resolution failed: %s", str(e))
             # 降級方案：嘗試使用系統PATH中的chromedriver Fallback: try system chromedriver
             try:
-                self.driver = webdriver.Chrome(options=chrome_options)
+                driver = webdriver.Chrome(options=chrome_options)
                 logger.info("Using system ChromeDriver from PATH")
             except Exception as e2:
                 logger.error("System ChromeDriver also failed: %s", str(e2))
                 raise Exception(f"無法初始化ChromeDriver: {str(e2)}")
         
+        # 注入就緒追蹤腳本並套用資源封鎖 Install readiness tracking and resource blocking
+        self._prepare_target(driver)
+        METRICS.inc("driver_starts", profile=self.profile)
+        
         logger.info("Chrome driver initialized successfully")
+        return driver
     
-    def crawl_stock_pdf(self, company_id, timeout=30):
+    def crawl_stock_pdf(self, company_id, timeout=30, only_sections=None):
         """
         爬取指定股票的PDF資料 Crawl PDF data for specified stock
         分別爬取基本資料、營收資訊、財報資訊三個欄位
@@ -128,83 +267,139 @@ class StockPDFCrawler:
         Args:
             company_id (str): 股票代碼 Stock company ID
             timeout (int): 等待超時秒數 Wait timeout in seconds
+            only_sections (list): 只爬取這些欄位（filename_suffix），None則全部
+                                  Restrict to these section suffixes, all if None
             
         Returns:
             bool: 成功返回True，失敗返回False
+            各欄位結果存於 last_section_results Per-section results are left in last_section_results
         """
+        start = time.perf_counter()
+        success = False
+        try:
+            success = self._crawl_stock_pdf(company_id, timeout, only_sections)
+            return success
+        finally:
+            # 每家公司總耗時與各欄位結果 Per-company wall time and per-section outcomes
+            METRICS.observe("company", time.perf_counter() - start, company_id, backend=self.backend)
+            METRICS.inc("companies", result="ok" if success else "failed")
+            for suffix, ok in self.last_section_results.items():
+                METRICS.inc("sections", section=suffix, result="ok" if ok else "failed")
+    
+    def _crawl_stock_pdf(self, company_id, timeout, only_sections):
+        """
+        crawl_stock_pdf 的實作 Implementation of crawl_stock_pdf
+        """
+        # 定義要爬取的欄位 Define sections to crawl
+        sections = [section for section in SECTIONS
+                    if only_sections is None or section["filename_suffix"] in only_sections]
+        results = {section["filename_suffix"]: False for section in sections}
+        self.last_section_results = results
+        self.last_wait_times = {}
+        self.last_pdf_paths = {}
+        
         if not company_id:
             logger.error("Company ID cannot be empty")
             return False
-            
-        # 定義要爬取的欄位 Define sections to crawl
-        sections = [
-            {"name": "基本資料", "class": "basic_info", "filename_suffix": "basic"},
-            {"name": "營收資訊", "class": "revenue_information", "filename_suffix": "revenue"},
-            {"name": "財報資訊", "class": "financial_report_information", "filename_suffix": "financial"}
-        ]
+        
+        # 已知或經API確認無效的代碼直接略過 Skip IDs known or confirmed to be invalid
+        # 驗證時取得的t146sb05資料留給指紋比對與API後端使用 The payload fetched to validate is reused below
+        with METRICS.timer("validate", company_id):
+            valid, info = self.validator.check(company_id) if self.validator else (True, None)
+        if not valid:
+            logger.error("Invalid company_id: %s, skipped", company_id)
+            return False
+        
+        fingerprints = {}
+        
+        # 增量模式：先比對API資料指紋，未變動的欄位不渲染 Incremental: skip sections whose API data is unchanged
+        if self.store:
+            fetched, info = info, None
+            try:
+                with METRICS.timer("fingerprint_check", company_id):
+                    # 營收PDF由完整營收歷史產生，摘要只有標題與連結，須以營收明細計算指紋
+                    # The revenue PDF is built from the full history; the summary holds only a title and link
+                    info = self.api_renderer.fetch(company_id, sections,
+                                                   fetched or self.api_renderer.client.fetch_company_info(company_id))
+            except InvalidCompanyError:
+                logger.error("Invalid company_id: %s", company_id)
+                if self.validator:
+                    self.validator.remember(company_id, False)
+                return False
+            except Exception as e:
+                logger.warning("Fingerprint check failed for company_id %s, rendering all sections: %s",
+                               company_id, str(e))
+            if info is not None:
+                fingerprints = {section["filename_suffix"]: fingerprint(self.api_renderer.section_data(section, info))
+                                for section in sections}
+                unchanged = [section["filename_suffix"] for section in sections
+                             if self.store.is_unchanged(company_id, section["filename_suffix"],
+                                                        fingerprints[section["filename_suffix"]])]
+                for suffix in unchanged:
+                    results[suffix] = True
+                sections = [section for section in sections if section["filename_suffix"] not in unchanged]
+                if not sections:
+                    logger.info("All sections unchanged for company_id %s, skipped", company_id)
+                    return True
+        
+        if self.backend == "api":
+            return self._crawl_via_api(company_id, sections, info, fingerprints)
         
         success_count = 0
+        wait_times = self.last_wait_times
+        pooled = None
+        crashed = False
         
         try:
-            self._setup_driver()
+            # 從驅動池借用已啟動的瀏覽器 Borrow a warm browser from the pool
+            with METRICS.timer("driver_acquire", company_id):
+                pooled = self.driver_pool.acquire()
+            self.driver = pooled.driver
             
             # 構建完整URL Build complete URL
             url = f"{self.base_url}?companyId={company_id}"
             logger.info("Navigating to URL: %s", url)
             
             # 訪問頁面 Navigate to page
-            self.driver.get(url)
+            self._throttle()
+            with METRICS.timer("navigate", company_id):
+                self.driver.get(url)
             
             # 等待頁面載入 Wait for page to load
             wait = WebDriverWait(self.driver, timeout)
+            deadline = min(timeout, self.selector_deadline)
             
             # 等待主要內容載入 Wait for main content to load
             try:
                 wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(3)  # 額外等待JavaScript渲染 Additional wait for JS rendering
-                logger.info("Page loaded for company_id: %s", company_id)
+                # 等待JavaScript渲染與網路閒置 Wait for JS rendering and network idle
+                wait_times["page"] = self.readiness.wait(self.driver)
+                METRICS.observe("page_ready", wait_times["page"], company_id)
+                logger.info("Page loaded for company_id: %s (ready after %.2fs)", company_id, wait_times["page"])
+                # 限流錯誤頁面回報速率限制器並放棄此公司 Throttling page: slow everyone down, give up on this company
+                if self._throttled():
+                    logger.error("Throttling page served for company_id: %s", company_id)
+                    return False
+                # 網站改版則清除選擇器快取 Drop learned selectors if the site markup changed
+                self.selector_cache.check_fingerprint(self.driver)
             except TimeoutException:
                 logger.error("Page load timeout for company_id: %s", company_id)
                 return False
             
-            # 依次處理每個欄位 Process each section
-            for section in sections:
-                logger.info("Processing section: %s for company_id: %s", section["name"], company_id)
-                
-                try:
-                    # 點擊對應的欄位按鈕 Click the section button
-                    section_button = self._find_section_button(wait, section["class"])
-                    if not section_button:
-                        logger.error("Section button not found: %s", section["name"])
-                        continue
-                    
-                    # 點擊欄位按鈕 Click section button
-                    logger.info("Clicking section button: %s", section["name"])
-                    self.driver.execute_script("arguments[0].click();", section_button)
-                    
-                    # 等待內容載入 Wait for content to load
-                    time.sleep(2)
-                    
-                    # 尋找打印按鈕 Find print button
-                    print_button = self._find_print_button(wait)
-                    if not print_button:
-                        logger.error("Print button not found for section: %s", section["name"])
-                        continue
-                    
-                    # 生成PDF Generate PDF
-                    success = self._generate_section_pdf(company_id, section, print_button)
-                    if success:
+            if self.parallel_sections and len(sections) > 1:
+                # 每個欄位一個分頁同時渲染 One tab per section, rendered concurrently
+                success_count = self._capture_in_tabs(company_id, url, sections, fingerprints, deadline)
+            else:
+                # 依次處理每個欄位 Process each section
+                for section in sections:
+                    logger.info("Processing section: %s for company_id: %s", section["name"], company_id)
+                    if self._open_section(company_id, section, deadline) and \
+                            self._print_section(company_id, section, deadline, fingerprints):
                         success_count += 1
-                        logger.info("Successfully generated PDF for section: %s", section["name"])
-                    else:
-                        logger.error("Failed to generate PDF for section: %s", section["name"])
-                    
-                    # 短暫延遲避免請求過於頻繁 Brief delay to avoid too frequent requests
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    logger.error("Error processing section %s: %s", section["name"], str(e))
-                    continue
+            
+            # 輸出各欄位等待時間 Report per-section wait times
+            logger.info("Readiness wait times for company_id %s: %s", company_id,
+                        ", ".join(f"{name}={seconds:.2f}s" for name, seconds in wait_times.items()))
             
             # 檢查是否至少成功一個 Check if at least one succeeded
             if success_count > 0:
@@ -216,20 +411,235 @@ class StockPDFCrawler:
                 return False
             
         except Exception as e:
+            # 瀏覽器崩潰則回收 Recycle the browser if it crashed
+            crashed = isinstance(e, WebDriverException)
             logger.error("Error occurred while crawling company_id %s: %s", company_id, str(e))
             return False
         finally:
-            if self.driver:
-                self.driver.quit()
-                logger.info("Browser driver closed")
+            if pooled:
+                self.driver_pool.release(pooled, failed=crashed)
+                self.driver = None
+    
+    def _throttled(self):
+        """
+        目前頁面是否為限流錯誤頁面，並回報速率限制器 Whether the page is a throttling error page; reported to the limiter
+        """
+        try:
+            text = self.driver.execute_script("return document.body ? document.body.innerText.slice(0, 2000) : '';")
+        except WebDriverException:
+            return False
+        throttled = is_throttle_page(text)
+        if self.rate_limiter:
+            self.rate_limiter.record(throttled=throttled)
+        return throttled
+    
+    def _prepare_target(self, driver):
+        """
+        設定目前分頁 Prepare the current tab
+        CDP設定只作用於目前分頁，新分頁需重新設定 CDP settings apply per tab, so new tabs need this too
+        """
+        PageReadiness.install(driver)
+        if self.profile == "lean":
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+            except Exception as e:
+                logger.warning("Resource blocking not applied: %s", str(e))
     
-    def _find_section_button(self, wait, section_class):
+    def _open_section(self, company_id, section, deadline):
+        """
+        點擊欄位按鈕，不等待內容 Click a section button without waiting for its content
+        
+        Returns:
+            bool: 已點擊返回True
+        """
+        try:
+            # 點擊對應的欄位按鈕 Click the section button
+            with METRICS.timer("selector_wait", company_id, kind="section", section=section["filename_suffix"]):
+                section_button = self._find_section_button(section["class"], deadline)
+            if not section_button:
+                logger.error("Section button not found: %s", section["name"])
+                return False
+            
+            # 點擊欄位按鈕 Click section button
+            logger.info("Clicking section button: %s", section["name"])
+            self._throttle()
+            self.driver.execute_script("arguments[0].click();", section_button)
+            return True
+        except Exception as e:
+            logger.error("Error opening section %s: %s", section["name"], str(e))
+            return False
+    
+    def _print_section(self, company_id, section, deadline, fingerprints):
+        """
+        等待欄位內容後輸出PDF Wait for a clicked section's content and print it
+        
+        Returns:
+            bool: 成功返回True
+        """
+        try:
+            # 等待內容載入 Wait for content to load
+            waited = self.readiness.wait(self.driver, section.get("container"))
+            self.last_wait_times[section["name"]] = waited
+            METRICS.observe("section_ready", waited, company_id, section=section["filename_suffix"])
+            logger.info("Section %s ready after %.2fs", section["name"], waited)
+            
+            # 尋找打印按鈕 Find print button
+            with METRICS.timer("selector_wait", company_id, kind="print", section=section["filename_suffix"]):
+                print_button = self._find_print_button(section["class"], deadline)
+            if not print_button:
+                logger.error("Print button not found for section: %s", section["name"])
+                return False
+            
+            # 生成PDF Generate PDF
+            success = self._generate_section_pdf(company_id, section, print_button,
+                                                 fingerprints.get(section["filename_suffix"]))
+        except Exception as e:
+            logger.error("Error processing section %s: %s", section["name"], str(e))
+            return False
+        
+        if success:
+            self.last_section_results[section["filename_suffix"]] = True
+            logger.info("Successfully generated PDF for section: %s", section["name"])
+        else:
+            logger.error("Failed to generate PDF for section: %s", section["name"])
+        return success
+    
+    def _capture_in_tabs(self, company_id, url, sections, fingerprints, deadline):
+        """
+        多分頁平行擷取 Capture sections in parallel tabs
+        其餘欄位各開一個分頁同時載入並點擊，頁面渲染並行；同一個瀏覽器session的列印仍依序進行
+        Extra tabs load and render concurrently; printing stays serialized on the one session
+        每個額外分頁都重新載入頁面並請求t146sb05，任一分頁遇到限流頁面則放棄此公司
+        Every extra tab reloads the page and its t146sb05 call; a throttling page in any tab aborts the company
+        
+        Args:
+            company_id (str): 股票代碼
+            url (str): 公司頁面網址，主分頁已載入 Company page URL, already loaded in the main tab
+            sections (list): 欄位資訊字典列表
+            fingerprints (dict): 各欄位資料指紋
+            deadline (float): 選擇器等待秒數
+            
+        Returns:
+            int: 成功的欄位數，遇到限流頁面為0 Sections captured, 0 after a throttling page
+        """
+        main_handle = self.driver.current_window_handle
+        tabs = [(main_handle, sections[0])]
+        try:
+            # 開新分頁並以非阻塞方式導航，各分頁同時載入 Open tabs with non-blocking navigation
+            for section in sections[1:]:
+                self.driver.switch_to.new_window('tab')
+                self._prepare_target(self.driver)
+                self._throttle()
+                self.driver.execute_script("window.location.href = arguments[0];", url)
+                tabs.append((self.driver.current_window_handle, section))
+            
+            # 額外分頁就緒後與主分頁相同，檢查限流頁面並回報速率限制器
+            # Like the main tab, each extra tab is checked for a throttling page once ready
+            for handle, section in tabs[1:]:
+                self.driver.switch_to.window(handle)
+                self.readiness.wait(self.driver)
+                if self._throttled():
+                    logger.error("Throttling page served in the %s tab for company_id: %s",
+                                 section["filename_suffix"], company_id)
+                    return 0
+            
+            # 點擊各分頁自己的欄位，內容在背景渲染 Click each tab's section; content renders in background
+            opened = []
+            for handle, section in tabs:
+                self.driver.switch_to.window(handle)
+                if self._open_section(company_id, section, deadline):
+                    opened.append((handle, section))
+            
+            # 依序列印 Print one tab at a time
+            success_count = 0
+            for handle, section in opened:
+                self.driver.switch_to.window(handle)
+                if self._print_section(company_id, section, deadline, fingerprints):
+                    success_count += 1
+            return success_count
+        finally:
+            # 關閉額外分頁，瀏覽器回到單一分頁後歸還驅動池 Close extra tabs before the driver goes back to the pool
+            for handle, _ in tabs[1:]:
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except WebDriverException as e:
+                    logger.warning("Failed to close tab: %s", str(e))
+            self.driver.switch_to.window(main_handle)
+    
+    def _crawl_via_api(self, company_id, sections, info=None, fingerprints=None):
+        """
+        以API渲染後端產生PDF Generate PDFs through the API backend
+        不啟動瀏覽器，直接以JSON資料套用HTML模板 No browser; JSON is rendered through HTML templates
+        
+        Args:
+            company_id (str): 股票代碼 Stock company ID
+            sections (list): 欄位資訊字典列表
+            info (dict): 已取得的t146sb05資料，None則重新請求 Already fetched t146sb05 result
+            fingerprints (dict): 各欄位資料指紋 Per-section data fingerprints
+            
+        Returns:
+            bool: 至少成功一個欄位返回True
+        """
+        fingerprints = fingerprints or {}
+        try:
+            with METRICS.timer("api_fetch", company_id):
+                info = self.api_renderer.fetch(company_id, sections, info)
+        except Exception as e:
+            logger.error("API request failed for company_id %s: %s", company_id, str(e))
+            return False
+        if info is None:
+            return False
+        
+        success_count = 0
+        for section in sections:
+            try:
+                pdf_path = self._pdf_path(company_id, section)
+                with METRICS.timer("api_render", company_id, section=section["filename_suffix"]):
+                    self.api_renderer.render_section(company_id, section, info, pdf_path)
+                success_count += 1
+                self.last_section_results[section["filename_suffix"]] = True
+                logger.info("PDF saved successfully: %s", pdf_path)
+                self._store_pdf(company_id, section, pdf_path, fingerprints.get(section["filename_suffix"]))
+            except Exception as e:
+                logger.error("Failed to render section %s: %s", section["name"], str(e))
+        
+        logger.info("Rendered %d out of %d PDFs via API for company_id: %s",
+                    success_count, len(sections), company_id)
+        return success_count > 0
+    
+    def _store_pdf(self, company_id, section, pdf_path, data_fingerprint):
+        """
+        將PDF移入內容定址儲存庫 Move a rendered PDF into the content-addressed store
+        """
+        if self.store:
+            with METRICS.timer("store_put", company_id, section=section["filename_suffix"]):
+                pdf_path = self.store.put_file(pdf_path, company_id, section["filename_suffix"], data_fingerprint)
+        self.last_pdf_paths[section["filename_suffix"]] = pdf_path
+    
+    def _pdf_path(self, company_id, section):
+        """
+        產生PDF檔案路徑 Build PDF output path
+        """
+        timestamp = int(time.time())
+        pdf_filename = f"stock_{company_id}_{section['filename_suffix']}_{timestamp}.pdf"
+        return os.path.join(self.download_path, pdf_filename)
+    
+    def _throttle(self):
+        """
+        送出會觸發網站請求的動作前取得速率令牌 Take a rate token before an action that hits the site
+        """
+        if self.rate_limiter:
+            METRICS.observe("rate_wait", self.rate_limiter.acquire(), path="selenium")
+    
+    def _find_section_button(self, section_class, deadline):
         """
         尋找欄位按鈕 Find section button
         
         Args:
-            wait: WebDriverWait實例
             section_class: 欄位按鈕的class名稱
+            deadline: 所有候選選擇器共用的等待秒數 Shared wait for all candidate selectors
             
         Returns:
             WebElement or None: 找到的按鈕元素
@@ -240,20 +650,9 @@ class StockPDFCrawler:
             f"*[class*='{section_class}']"
         ]
         
-        for selector in selectors:
-            try:
-                element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
-                logger.info("Section button found with selector: %s", selector)
-                return element
-            except TimeoutException:
-                continue
-            except Exception as e:
-                logger.warning("Error with selector %s: %s", selector, str(e))
-                continue
-        
-        return None
+        return self.selector_cache.find(self.driver, f"section:{section_class}", selectors, deadline)
     
-    def _generate_section_pdf(self, company_id, section, print_button):
+    def _generate_section_pdf(self, company_id, section, print_button, data_fingerprint=None):
         """
         為特定欄位生成PDF Generate PDF for specific section
         
@@ -261,20 +660,19 @@ class StockPDFCrawler:
             company_id: 股票代碼
             section: 欄位資訊字典
             print_button: 打印按鈕元素
+            data_fingerprint: 欄位API資料指紋，存入儲存庫索引 Section data fingerprint for the store index
             
         Returns:
             bool: 成功返回True，失敗返回False
         """
         try:
             # 生成PDF檔名 Generate PDF filename
-            timestamp = int(time.time())
-            pdf_filename = f"stock_{company_id}_{section['filename_suffix']}_{timestamp}.pdf"
-            pdf_path = os.path.join(self.download_path, pdf_filename)
+            pdf_path = self._pdf_path(company_id, section)
             
             logger.info("Generating PDF for section: %s", section["name"])
             
             # 使用Chrome DevTools Protocol生成PDF Use Chrome DevTools Protocol to generate PDF
-            result = self.driver.execute_cdp_cmd('Page.printToPDF', {
+            params = {
                 'landscape': False,
                 'displayHeaderFooter': False,
                 'printBackground': True,
@@ -285,27 +683,66 @@ class StockPDFCrawler:
                 'marginBottom': 0.4,
                 'marginLeft': 0.4,
                 'marginRight': 0.4,
-            })
+            }
+            if self.stream_pdf:
+                params['transferMode'] = 'ReturnAsStream'
+            with METRICS.timer("print_to_pdf", company_id, section=section["filename_suffix"]):
+                result = self.driver.execute_cdp_cmd('Page.printToPDF', params)
             
             # 保存PDF Save PDF
-            with open(pdf_path, 'wb') as file:
-                import base64
-                file.write(base64.b64decode(result['data']))
+            with METRICS.timer("pdf_write", company_id, section=section["filename_suffix"]):
+                if result.get('stream'):
+                    self._save_pdf_stream(result['stream'], pdf_path)
+                else:
+                    with open(pdf_path, 'wb') as file:
+                        file.write(base64.b64decode(result['data']))
             
             logger.info("PDF saved successfully: %s", pdf_path)
+            self._store_pdf(company_id, section, pdf_path, data_fingerprint)
             return True
             
         except Exception as e:
             logger.error("Failed to generate PDF for section %s: %s", section["name"], str(e))
             return False
     
-    def _find_print_button(self, wait):
+    def _save_pdf_stream(self, handle, pdf_path):
+        """
+        以CDP串流逐塊寫入PDF Write a CDP PDF stream to disk chunk by chunk
+        先寫入同目錄暫存檔，完成後原子性更名 Writes a temp file in the same directory, then renames atomically
+        
+        Args:
+            handle: Page.printToPDF 回傳的串流代號 Stream handle returned by Page.printToPDF
+            pdf_path: 輸出路徑 Output path
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(pdf_path))
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                while True:
+                    chunk = self.driver.execute_cdp_cmd('IO.read', {'handle': handle, 'size': self.pdf_chunk_size})
+                    data = chunk.get('data', '')
+                    if data:
+                        file.write(base64.b64decode(data) if chunk.get('base64Encoded') else data.encode('latin-1'))
+                    if chunk.get('eof'):
+                        break
+            os.replace(tmp_path, pdf_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            try:
+                self.driver.execute_cdp_cmd('IO.close', {'handle': handle})
+            except Exception as e:
+                logger.warning("Failed to close PDF stream: %s", str(e))
+    
+    def _find_print_button(self, section_class, deadline):
         """
         尋找打印按鈕 Find print button
         根據提供的HTML結構尋找包含打印圖標的元素
         
         Args:
-            wait: WebDriverWait實例
+            section_class: 目前欄位的class名稱，作為快取鍵 Current section class, used as cache key
+            deadline: 所有候選選擇器共用的等待秒數 Shared wait for all candidate selectors
             
         Returns:
             WebElement or None: 找到的打印按鈕元素
@@ -324,25 +761,7 @@ class StockPDFCrawler:
             "//*[contains(text(), '列印') or contains(text(), 'print') or contains(text(), 'Print')]"
         ]
         
-        for selector in selectors:
-            try:
-                if selector.startswith('/'):
-                    # XPath選擇器 XPath selector
-                    element = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                else:
-                    # CSS選擇器 CSS selector
-                    element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
-                
-                logger.info("Print button found with selector: %s", selector)
-                return element
-                
-            except TimeoutException:
-                continue
-            except Exception as e:
-                logger.warning("Error with selector %s: %s", selector, str(e))
-                continue
-        
-        return None
+        return self.selector_cache.find(self.driver, f"print:{section_class}", selectors, deadline)
 
 
 def main():
@@ -350,23 +769,27 @@ def main():
     主函數 Main function
     示範如何使用StockPDFCrawler
     """
-    # 初始化爬蟲 Initialize crawler
-    crawler = StockPDFCrawler(download_path="./stock_pdfs")
-    
     # 測試股票代碼列表 Test stock company IDs
     test_company_ids = ["2049", "2330", "2454"]  # 可自定義股票代碼 Customizable stock IDs
     
-    for company_id in test_company_ids:
-        logger.info("Starting crawl for company_id: %s", company_id)
-        success = crawler.crawl_stock_pdf(company_id)
-        
-        if success:
-            logger.info("Successfully crawled company_id: %s", company_id)
-        else:
-            logger.error("Failed to crawl company_id: %s", company_id)
-        
-        # 避免過於頻繁請求 Avoid too frequent requests
-        time.sleep(5)
+    # 自適應速率限制取代固定等待：網站健康時加速，被限流時減速
+    # An adaptive rate limit replaces fixed sleeps: faster while the site is healthy, slower when it throttles
+    rate_limiter = AdaptiveRateLimiter(rate=1.0, max_rate=5.0)
+    
+    # 初始化爬蟲，瀏覽器在各股票間重複使用 Initialize crawler; the browser is reused across stocks
+    with StockPDFCrawler(download_path="./stock_pdfs", rate_limiter=rate_limiter) as crawler:
+        for company_id in test_company_ids:
+            logger.info("Starting crawl for company_id: %s", company_id)
+            success = crawler.crawl_stock_pdf(company_id)
+            
+            if success:
+                logger.info("Successfully crawled company_id: %s", company_id)
+            else:
+                logger.error("Failed to crawl company_id: %s", company_id)
+    
+    # 輸出各階段耗時指標 Export per-phase metrics
+    prom_path, json_path = METRICS.export("./metrics", "stock_pdf_crawler")
+    logger.info("Metrics written to %s and %s", prom_path, json_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量同步水位 Incremental Sync Watermarks
+記錄每家公司已載入的最新 (年份, 月份) 與各區塊資料指紋，只處理新的或有變動的資料
+"""
+
+import threading
+import logging
+
+from mops_api import REVENUE_COLUMNS
+from pdf_store import fingerprint
+from db_utils import sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS company_sync (
+    company_id  TEXT PRIMARY KEY,
+    rev_year    INTEGER,
+    rev_month   INTEGER,
+    revenue_fp  TEXT,
+    basic_fp    TEXT,
+    report_fp   TEXT
+)
+"""
+
+_YEAR = REVENUE_COLUMNS.index('年份')
+_MONTH = REVENUE_COLUMNS.index('月份')
+
+
+def _period(row):
+    """
+    營收列的 (年份, 月份)，無法解析則None Revenue row period, None if unparsable
+    """
+    try:
+        return int(str(row[_YEAR]).strip()), int(str(row[_MONTH]).strip())
+    except (ValueError, IndexError):
+        return None
+
+
+def _summary_period(revenue_information):
+    """
+    t146sb05營收摘要中最新的 (年份, 月份)，摘要沒有期間資訊則None
+    Latest period shown in the t146sb05 revenue summary, None when the summary carries no period
+    """
+    if not isinstance(revenue_information, dict):
+        return None
+    data = revenue_information.get('data')
+    if isinstance(data, list):
+        rows = [row for row in data if isinstance(row, (list, tuple))]
+    elif '年份' in revenue_information and '月份' in revenue_information:
+        row = [None] * len(REVENUE_COLUMNS)
+        row[_YEAR], row[_MONTH] = revenue_information['年份'], revenue_information['月份']
+        rows = [row]
+    else:
+        return None
+    periods = [period for period in map(_period, rows) if period is not None]
+    return max(periods) if periods else None
+
+
+class IncrementalSync:
+    """
+    增量同步 Incremental sync
+    啟動時載入全部水位；資料庫寫入成功後才呼叫commit()更新水位
+    Watermarks are loaded up front and only advanced by commit() after the data load succeeded
+    """
+
+    def __init__(self, path="./sync_state.sqlite3", full_refresh=False):
+        """
+        初始化 Initialize
+
+        Args:
+            path (str): 水位資料庫路徑 Watermark database path
+            full_refresh (bool): 忽略水位重新載入全部 Ignore watermarks and reload everything
+        """
+        self.path = path
+        self.full_refresh = full_refresh
+        self._lock = threading.Lock()
+        self._pending = {}
+        with sqlite_connection(self.path) as conn:
+            conn.execute(SCHEMA)
+            rows = conn.execute(
+                "SELECT company_id, rev_year, rev_month, revenue_fp, basic_fp, report_fp FROM company_sync"
+            ).fetchall()
+        self._state = {
+            row[0]: {"period": (row[1], row[2]) if row[1] is not None else None,
+                     "revenue_fp": row[3], "basic_fp": row[4], "report_fp": row[5]}
+            for row in rows
+        }
+
+    def needs_revenue(self, company_id, output):
+        """
+        是否需要請求營收明細 Whether the revenue history must be fetched
+        只有摘要能證明沒有比水位更新的月份時才跳過；摘要沒有期間資訊（例如只有標題與連結）則一律請求
+        Skipped only when the summary proves nothing is newer than the watermark; a summary without
+        a period (e.g. just a title and link) always fetches, and apply() diffs the rows against the watermark
+        """
+        if self.full_refresh:
+            return True
+        state = self._state.get(company_id)
+        if not state or not state.get("period"):
+            return True
+        latest = _summary_period(output.get('revenue_information'))
+        return latest is None or latest > tuple(state["period"])
+
+    def apply(self, builder, company_id, output, revenue_rows):
+        """
+        只把新的或變動的部分加入builder Add only new or changed parts to the builder
+
+        Args:
+            builder (FrameBuilder): 目前批次的組裝器
+            company_id (str): 股票代碼
+            output (dict): t146sb05 回應中的result
+            revenue_rows (list or None): 營收明細，None表示已跳過 Revenue rows, None when skipped
+
+        Returns:
+            dict: 各區塊加入的列數 Rows added per part
+        """
+        state = self._state.get(company_id) or {}
+        if self.full_refresh:
+            state = {}
+        update = dict(state)
+        added = {"basic": 0, "revenue": 0, "report": 0}
+
+        basic_fp = fingerprint(output.get('basic_info'))
+        if basic_fp != state.get("basic_fp"):
+            builder.add_basic(company_id, output)
+            added["basic"] = 1
+            update["basic_fp"] = basic_fp
+
+        report_fp = fingerprint(output.get('financial_report_information'))
+        if report_fp != state.get("report_fp"):
+            builder.add_report(company_id, output)
+            added["report"] = 1
+            update["report_fp"] = report_fp
+
+        if revenue_rows is not None:
+            watermark = state.get("period")
+            new_rows = []
+            for row in revenue_rows:
+                period = _period(row)
+                if watermark is None or period is None or period > watermark:
+                    new_rows.append(row)
+            if new_rows:
+                builder.add_revenue(company_id, new_rows)
+                periods = [p for p in map(_period, new_rows) if p is not None]
+                if periods:
+                    update["period"] = max(periods + ([watermark] if watermark else []))
+            added["revenue"] = len(new_rows)
+            update["revenue_fp"] = fingerprint(output.get('revenue_information'))
+
+        with self._lock:
+            self._pending[company_id] = update
+        return added
+
+    def commit(self, company_ids=None):
+        """
+        資料載入成功後寫入新水位 Persist watermarks after the data load succeeded
+
+        Args:
+            company_ids (list): 只提交這些公司，None為全部；多個執行緒共用時各自提交自己載入的公司
+                                Commit only these companies, all if None; threads sharing one instance
+                                commit only what they loaded
+        """
+        with self._lock:
+            pending = self._take(company_ids)
+        if not pending:
+            return
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO company_sync "
+                "(company_id, rev_year, rev_month, revenue_fp, basic_fp, report_fp) VALUES (?, ?, ?, ?, ?, ?)",
+                [(company_id,
+                  state["period"][0] if state.get("period") else None,
+                  state["period"][1] if state.get("period") else None,
+                  state.get("revenue_fp"), state.get("basic_fp"), state.get("report_fp"))
+                 for company_id, state in pending.items()],
+            )
+        self._state.update(pending)
+        logger.info("Watermarks updated for %d companies", len(pending))
+
+    def discard(self, company_ids=None):
+        """
+        資料載入失敗時捨棄尚未提交的水位，避免下一批commit()把未載入的資料標記為已載入
+        Drop uncommitted watermarks after a failed load, so the next commit() cannot mark them loaded
+
+        Args:
+            company_ids (list): 只捨棄這些公司，None為全部 Discard only these companies, all if None
+        """
+        with self._lock:
+            discarded = len(self._take(company_ids))
+        if discarded:
+            logger.info("Discarded watermarks for %d companies", discarded)
+
+    def _take(self, company_ids):
+        """
+        取出待提交水位，呼叫端需持有鎖 Remove and return pending watermarks; caller holds the lock
+        """
+        if company_ids is None:
+            pending, self._pending = self._pending, {}
+            return pending
+        return {company_id: self._pending.pop(company_id) for company_id in company_ids
+                if company_id in self._pending}
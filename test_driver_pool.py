@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瀏覽器驅動池離線測試 Offline Driver Pool Test
+以假的瀏覽器確認借出、歸還與回收時等待者會被喚醒
+"""
+
+import threading
+
+import pytest
+
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if self.quit_called:
+            raise RuntimeError("driver is gone")
+        return 1
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _acquire_in_thread(pool, timeout):
+    """
+    在背景執行緒借用 Acquire from a background thread
+
+    Returns:
+        tuple: (執行緒 thread, 結果 dict holding "driver" or "error")
+    """
+    outcome = {}
+
+    def run():
+        try:
+            outcome["driver"] = pool.acquire(timeout=timeout)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_idle_driver_is_reused():
+    pool = DriverPool(FakeDriver, size=1)
+    first = pool.acquire(timeout=1)
+    pool.release(first)
+    assert pool.acquire(timeout=1) is first
+
+
+def test_timeout_when_pool_is_exhausted():
+    pool = DriverPool(FakeDriver, size=1)
+    pool.acquire(timeout=1)
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.1)
+
+
+@pytest.mark.parametrize("discard", [
+    lambda pool, pooled: pool.release(pooled, failed=True),
+    lambda pool, pooled: (setattr(pooled, "pages", pool.max_pages), pool.release(pooled)),
+])
+def test_waiter_creates_driver_after_discard(discard):
+    pool = DriverPool(FakeDriver, size=1, max_pages=3)
+    lent = pool.acquire(timeout=1)
+    thread, outcome = _acquire_in_thread(pool, timeout=5)
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    # 借出的瀏覽器被回收，等待者應建立新的 The lent browser is discarded; the waiter must start a new one
+    discard(pool, lent)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert "error" not in outcome
+    assert outcome["driver"] is not lent
+    assert lent.driver.quit_called
+
+
+def test_waiter_receives_released_driver():
+    pool = DriverPool(FakeDriver, size=1)
+    lent = pool.acquire(timeout=1)
+    thread, outcome = _acquire_in_thread(pool, timeout=None)
+    pool.release(lent)
+    thread.join(5)
+    assert outcome["driver"] is lent
+
+
+def test_close_wakes_waiters():
+    pool = DriverPool(FakeDriver, size=1)
+    pool.acquire(timeout=1)
+    thread, outcome = _acquire_in_thread(pool, timeout=None)
+    thread.join(0.2)
+    pool.close()
+    thread.join(5)
+    assert isinstance(outcome["error"], RuntimeError)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF增量產生離線測試 Offline Incremental PDF Test
+以 mops_stub 替身伺服器與API後端確認營收新增月份時營收PDF會重新產生
+"""
+
+import json
+import shutil
+
+from mops_stub import MopsStub, DEFAULT_FIXTURES
+from stock_pdf_crawler import StockPDFCrawler
+
+
+def _write_html(document, pdf_path):
+    """
+    測試用渲染器，直接寫出HTML Test renderer writing the HTML as is
+    """
+    with open(pdf_path, "w", encoding="utf-8") as file:
+        file.write(document)
+
+
+def _crawl_once(tmp_path, fixtures_dir, company_id="2330"):
+    """
+    以API後端爬取一次 Crawl once through the API backend
+
+    Returns:
+        tuple: (結果 result, 各欄位結果 section results, 各欄位PDF PDF paths, 各API請求次數 requests per endpoint)
+    """
+    with MopsStub(fixtures_dir=fixtures_dir) as stub:
+        crawler = StockPDFCrawler(download_path=str(tmp_path / "pdfs"), backend="api",
+                                  store_path=str(tmp_path / "pdf_store"), site_url=stub.url,
+                                  company_cache_path=str(tmp_path / "company_ids.sqlite3"))
+        crawler.api_renderer.renderer = _write_html
+        crawler.api_renderer.client.backoff = 0.01
+        with crawler:
+            success = crawler.crawl_stock_pdf(company_id)
+        return success, dict(crawler.last_section_results), dict(crawler.last_pdf_paths), dict(stub.hits)
+
+
+def test_unchanged_company_is_skipped(tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    shutil.copytree(DEFAULT_FIXTURES, fixtures_dir)
+
+    success, sections, paths, requests = _crawl_once(tmp_path, fixtures_dir)
+    assert success and all(sections.values())
+    assert sorted(paths) == ["basic", "financial", "revenue"]
+    # 驗證取得的資料供指紋比對與渲染共用 The payload fetched to validate serves fingerprints and rendering
+    assert requests["t146sb05"] == 1
+
+    success, sections, paths, _ = _crawl_once(tmp_path, fixtures_dir)
+    assert success and all(sections.values())
+    assert paths == {}
+
+
+def test_new_revenue_month_renders_revenue(tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    shutil.copytree(DEFAULT_FIXTURES, fixtures_dir)
+    _crawl_once(tmp_path, fixtures_dir)
+
+    # 摘要不變，只有營收明細多一個月 The summary is unchanged; only the revenue history gains a month
+    path = fixtures_dir / "revenue" / "2330.json"
+    with open(path, encoding="utf-8") as file:
+        body = json.load(file)
+    body["result"]["data"].insert(0, ["114", "1", "1,000", "900", "11.11", "1,000", "900", "11.11"])
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(body, file, ensure_ascii=False)
+
+    success, sections, paths, requests = _crawl_once(tmp_path, fixtures_dir)
+    assert success and all(sections.values())
+    assert requests["t05st10_ifrs"] == 1
+    assert sorted(paths) == ["revenue"]
+    with open(paths["revenue"], encoding="utf-8") as file:
+        assert "1,000" in file.read()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量同步離線測試 Offline Incremental Sync Test
+以 mops_stub 替身伺服器確認新月份的營收會被請求並載入
+"""
+
+import json
+import shutil
+
+from mops_stub import MopsStub, DEFAULT_FIXTURES
+from mops_api import MopsClient
+from frame_builder import FrameBuilder
+from sync_state import IncrementalSync
+
+
+def _sync_once(fixtures_dir, sync, company_id="2330"):
+    """
+    對替身伺服器同步一次 Run one sync against the stand-in
+
+    Returns:
+        tuple: (新增列數 rows added, 營收API請求次數 revenue requests)
+    """
+    with MopsStub(fixtures_dir=fixtures_dir) as stub:
+        client = MopsClient(base_url=stub.api_url, backoff=0.01)
+        builder = FrameBuilder()
+        for stock_code, fetched, error in client.fetch_many([company_id], need_revenue=sync.needs_revenue):
+            assert error is None
+            added = sync.apply(builder, stock_code, *fetched)
+        sync.commit()
+        client.close()
+        return added, stub.hits.get("t05st10_ifrs", 0)
+
+
+def _edit(path, change):
+    with open(path, encoding="utf-8") as file:
+        body = json.load(file)
+    change(body)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(body, file, ensure_ascii=False)
+
+
+def test_new_month_is_fetched(tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    shutil.copytree(DEFAULT_FIXTURES, fixtures_dir)
+    sync = IncrementalSync(str(tmp_path / "sync_state.sqlite3"))
+
+    added, requests = _sync_once(fixtures_dir, sync)
+    assert requests == 1
+    assert added["revenue"] > 0
+
+    # 摘要只有標題與連結，新月份仍須請求 The summary carries no period, so the new month must still be fetched
+    new_row = ["114", "1", "1,000", "900", "11.11", "1,000", "900", "11.11"]
+    _edit(fixtures_dir / "revenue" / "2330.json", lambda body: body["result"]["data"].insert(0, new_row))
+    added, requests = _sync_once(fixtures_dir, sync)
+    assert requests == 1
+    assert added["revenue"] == 1
+
+
+def test_summary_at_watermark_skips_revenue(tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    shutil.copytree(DEFAULT_FIXTURES, fixtures_dir)
+    sync = IncrementalSync(str(tmp_path / "sync_state.sqlite3"))
+    _sync_once(fixtures_dir, sync)
+
+    with open(fixtures_dir / "revenue" / "2330.json", encoding="utf-8") as file:
+        latest = json.load(file)["result"]["data"][0]
+    _edit(fixtures_dir / "t146sb05" / "2330.json",
+          lambda body: body["result"]["revenue_information"].update(data=[latest]))
+    added, requests = _sync_once(fixtures_dir, sync)
+    assert requests == 0
+    assert added["revenue"] == 0
@@ -34,6 +34,8 @@ def test_single_stock():
             
     except Exception as e:
         logger.error("測試過程中發生錯誤: %s", str(e))
+    finally:
+        crawler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作佇列離線測試 Offline Work Queue Test
+以SQLite確認租約互斥、逾期重新分派、次數上限與失去租約後的完成語意，不需網路
+"""
+
+import time
+import sqlite3
+
+from mops_stub import MopsStub
+from mops_api import MopsClient
+from rdb_loader import RDBLoader
+from sync_state import IncrementalSync
+from work_queue import WorkQueue, PENDING, LEASED, DONE, FAILED
+from queue_worker import QueueWorker
+
+COMPANY_IDS = [str(1000 + index) for index in range(10)]
+
+
+def _queue(path, **kwargs):
+    """
+    每個worker各自一條連線 One connection per worker, as on separate nodes
+    """
+    return WorkQueue(sqlite3.connect(str(path), timeout=30), **kwargs)
+
+
+def _status(queue, company_id):
+    return queue._query("SELECT status, attempts FROM {table} WHERE queue_name = ? AND company_id = ?",
+                        (queue.queue_name, company_id))[0]
+
+
+def test_two_workers_never_share_a_lease(tmp_path):
+    path = tmp_path / "work_queue.sqlite3"
+    first, second = _queue(path), _queue(path)
+    assert first.enqueue(COMPANY_IDS) == len(COMPANY_IDS)
+    assert second.enqueue(COMPANY_IDS) == 0
+
+    leased_first = first.lease("worker-1", count=4)
+    leased_second = second.lease("worker-2", count=100)
+    assert len(leased_first) == 4
+    assert not set(leased_first) & set(leased_second)
+    assert sorted(leased_first + leased_second) == COMPANY_IDS
+    assert first.lease("worker-1", count=100) == []
+    assert first.stats() == {PENDING: 0, LEASED: len(COMPANY_IDS), DONE: 0, FAILED: 0}
+
+
+def test_expired_lease_is_leased_again(tmp_path):
+    path = tmp_path / "work_queue.sqlite3"
+    first, second = _queue(path, visibility_timeout=0.05), _queue(path, visibility_timeout=0.05)
+    first.enqueue(["2330"])
+    assert first.lease("worker-1") == ["2330"]
+    assert second.lease("worker-2") == []
+
+    # worker-1 沒有延長租約，逾期後由 worker-2 取得 worker-1 stops extending; its lease expires
+    time.sleep(0.1)
+    assert first.stats()[PENDING] == 1
+    assert second.lease("worker-2") == ["2330"]
+    assert _status(second, "2330") == (LEASED, 2)
+
+
+def test_extend_keeps_the_lease(tmp_path):
+    path = tmp_path / "work_queue.sqlite3"
+    first, second = _queue(path, visibility_timeout=0.2), _queue(path, visibility_timeout=0.2)
+    first.enqueue(["2330"])
+    first.lease("worker-1")
+    time.sleep(0.15)
+    first.extend(["2330"], "worker-1")
+    time.sleep(0.1)
+    assert second.lease("worker-2") == []
+
+
+def test_expired_leases_exhaust_after_max_attempts(tmp_path):
+    queue = _queue(tmp_path / "work_queue.sqlite3", visibility_timeout=0.05, max_attempts=2)
+    queue.enqueue(["2330"])
+    for _ in range(2):
+        assert queue.lease("worker-1") == ["2330"]
+        time.sleep(0.1)
+    # 兩次租約都逾期，不再租出 Both leases expired; the item is not handed out a third time
+    assert queue.stats()[FAILED] == 1
+    assert queue.lease("worker-1") == []
+    assert _status(queue, "2330") == (FAILED, 2)
+
+    assert queue.retry_failed() == 1
+    assert queue.lease("worker-1") == ["2330"]
+
+
+def test_failures_retry_until_max_attempts(tmp_path):
+    queue = _queue(tmp_path / "work_queue.sqlite3", max_attempts=2)
+    queue.enqueue(["2330", "0001"])
+
+    assert queue.lease("worker-1", count=2) == ["0001", "2330"]
+    assert queue.fail("0001", "worker-1", "invalid company id", retry=False)
+    assert queue.fail("2330", "worker-1", "timeout")
+    assert _status(queue, "0001")[0] == FAILED
+    assert _status(queue, "2330")[0] == PENDING
+
+    assert queue.lease("worker-1", count=2) == ["2330"]
+    assert queue.fail("2330", "worker-1", "timeout")
+    assert _status(queue, "2330") == (FAILED, 2)
+    assert queue.lease("worker-1") == []
+
+
+def test_complete_after_lease_was_lost(tmp_path):
+    path = tmp_path / "work_queue.sqlite3"
+    first, second = _queue(path, visibility_timeout=0.05), _queue(path, visibility_timeout=0.05)
+    first.enqueue(["2330"])
+    first.lease("worker-1")
+    time.sleep(0.1)
+    assert second.lease("worker-2") == ["2330"]
+
+    # 原持有者晚到的完成與失敗都被忽略 The late original owner can neither complete nor fail the item
+    assert not first.complete("2330", "worker-1")
+    assert not first.fail("2330", "worker-1", "late")
+    assert _status(first, "2330")[0] == LEASED
+
+    assert second.complete("2330", "worker-2")
+    assert _status(first, "2330")[0] == DONE
+    assert not second.complete("2330", "worker-2")
+
+
+class _FailingLoader:
+    """
+    第一次載入失敗的載入器 Loader whose first load fails
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.calls = 0
+
+    def load_all(self, *frames):
+        self.calls += 1
+        if self.calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return self.loader.load_all(*frames)
+
+
+def test_failed_load_requeues_batch_without_watermarks(tmp_path):
+    queue = _queue(tmp_path / "work_queue.sqlite3", max_attempts=3)
+    queue.enqueue(COMPANY_IDS[:3])
+    connection = sqlite3.connect(str(tmp_path / "stock_data.db"))
+    loader = _FailingLoader(RDBLoader(connection, create_tables=True))
+    sync = IncrementalSync(str(tmp_path / "sync_state.sqlite3"))
+
+    with MopsStub() as stub:
+        client = MopsClient(base_url=stub.api_url, backoff=0.01)
+        worker = QueueWorker(queue, client=client, loader=loader, sync=sync, worker_id="worker-1", idle_sleep=0.01)
+        stats = worker.run()
+        client.close()
+
+    # 第一批載入失敗後放回佇列，水位未提交，重試時完整載入 The retry reloads everything
+    assert stats == {PENDING: 0, LEASED: 0, DONE: 3, FAILED: 0}
+    assert loader.calls == 2
+    revenue_companies = connection.execute('SELECT COUNT(DISTINCT "股票代碼") FROM table_name2').fetchone()[0]
+    assert revenue_companies == 3
+    assert all(_status(queue, company_id) == (DONE, 2) for company_id in COMPANY_IDS[:3])
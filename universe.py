@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市場公司清單 Market Universe Loader
+由證交所國際證券辨識號碼頁面取得全部上市、上櫃股票代碼
+"""
+
+import logging
+
+import requests
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+ISIN_URL = "https://isin.twse.com.tw/isin/C_public.jsp"
+
+# 市場對應 strMode Market -> strMode of the ISIN page
+MARKETS = {
+    "listed": 2,  # 上市 TWSE
+    "otc": 4,     # 上櫃 TPEx
+}
+
+# 只取此分類下的普通股 Only rows under this heading (common shares)
+STOCK_HEADING = "股票"
+
+
+def parse_isin_page(html, market):
+    """
+    解析ISIN頁面表格 Parse the ISIN table
+
+    Args:
+        html (str): 頁面內容 Page HTML
+        market (str): 市場名稱 Market name
+
+    Returns:
+        list: [{company_id, name, market, industry}]
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    companies = []
+    heading = None
+    for row in soup.find_all("tr"):
+        cells = row.find_all("td")
+        if len(cells) == 1:
+            # 分類標題列，例如「股票」「上市認購(售)權證」 Category heading row
+            heading = cells[0].get_text(strip=True)
+            continue
+        if heading != STOCK_HEADING or len(cells) < 5:
+            continue
+        code_name = cells[0].get_text(strip=True).replace("　", " ").split(None, 1)
+        if not code_name or not code_name[0].isdigit():
+            continue
+        companies.append({
+            "company_id": code_name[0],
+            "name": code_name[1] if len(code_name) > 1 else "",
+            "market": market,
+            "industry": cells[4].get_text(strip=True),
+        })
+    return companies
+
+
+class UniverseLoader:
+    """
+    公司清單載入器 Universe loader
+    """
+
+    def __init__(self, session=None, timeout=30):
+        """
+        初始化 Initialize
+
+        Args:
+            session (requests.Session): 共用連線，None則自行建立 Shared session, created if None
+            timeout (float): 請求逾時秒數 Request timeout
+        """
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def load(self, markets=("listed", "otc")):
+        """
+        取得指定市場的全部普通股 All common shares of the given markets
+
+        Returns:
+            list: [{company_id, name, market, industry}]，依代碼排序並去重 Sorted by ID, deduplicated
+        """
+        companies = {}
+        for market in markets:
+            response = self.session.get(ISIN_URL, params={"strMode": MARKETS[market]}, timeout=self.timeout)
+            response.raise_for_status()
+            # 頁面為Big5編碼 The page is Big5 (cp950) encoded
+            response.encoding = "cp950"
+            rows = parse_isin_page(response.text, market)
+            logger.info("Loaded %d %s companies", len(rows), market)
+            for company in rows:
+                companies.setdefault(company["company_id"], company)
+        return [companies[company_id] for company_id in sorted(companies)]
+
+    def company_ids(self, markets=("listed", "otc")):
+        """
+        只取股票代碼 Company IDs only
+        """
+        return [company["company_id"] for company in self.load(markets)]
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+租約式工作佇列 Lease-based Work Queue
+多台機器共用同一個資料庫佇列，每家公司以租約方式取得，worker中斷時租約逾期後自動重新分派
+本機使用SQLite，正式環境可用任何DB-API驅動（pyodbc、pymysql、psycopg2等）
+"""
+
+import os
+import time
+import zlib
+import socket
+import logging
+
+from db_utils import detect_paramstyle
+
+logger = logging.getLogger(__name__)
+
+# 狀態 Item states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    queue_name    VARCHAR(64) NOT NULL,
+    company_id    VARCHAR(16) NOT NULL,
+    status        VARCHAR(16) NOT NULL,
+    lease_owner   VARCHAR(128),
+    lease_expires FLOAT,
+    attempts      INTEGER NOT NULL,
+    last_error    VARCHAR(512),
+    updated_at    FLOAT NOT NULL,
+    PRIMARY KEY (queue_name, company_id)
+)
+"""
+
+
+def default_worker_id():
+    """
+    主機名稱加程序編號 Host name plus process ID
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    工作佇列 Work queue
+    取得租約是逐筆的條件式UPDATE（比對狀態與逾期時間），只有一個worker能成功，不需資料庫專屬的鎖定語法
+    Leasing is a conditional UPDATE per item, so exactly one worker wins without database-specific locking.
+    各節點時鐘需大致同步 Node clocks must be roughly in sync
+    """
+
+    def __init__(self, connection, queue_name="default", visibility_timeout=900, max_attempts=3,
+                 shard=None, table="work_queue", paramstyle=None, create_table=True):
+        """
+        初始化佇列 Initialize queue
+
+        Args:
+            connection: DB-API連線，每個worker程序各自一條 DB-API connection, one per worker process
+            queue_name (str): 佇列名稱 Queue name, several queues can share a table
+            visibility_timeout (float): 租約秒數，逾期未完成則重新分派 Lease seconds before re-leasing
+            max_attempts (int): 失敗幾次後不再重試 Attempts before an item stays failed
+            shard (tuple): (index, count)，優先取得自己分片的公司，沒有時再取其他分片
+                           Preferred shard; other shards are taken once this one is drained
+            table (str): 表名 Table name
+            paramstyle (str): 參數樣式，None則由驅動模組判斷 qmark/numeric/format/pyformat
+            create_table (bool): 表不存在時建立 Create the table if missing
+        """
+        self.connection = connection
+        self.queue_name = queue_name
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.shard = shard
+        self.table = table
+        self.paramstyle = paramstyle or detect_paramstyle(connection)
+        if create_table:
+            self._execute(SCHEMA, ())
+
+    def enqueue(self, company_ids):
+        """
+        加入公司，已存在者不變 Add companies; existing items are left alone
+
+        Returns:
+            int: 新加入數量 Items added
+        """
+        existing = {row[0] for row in self._query(
+            "SELECT company_id FROM {table} WHERE queue_name = ?", (self.queue_name,))}
+        now = time.time()
+        rows = [(self.queue_name, company_id, PENDING, 0, now)
+                for company_id in dict.fromkeys(company_ids) if company_id not in existing]
+        if rows:
+            self._executemany(
+                "INSERT INTO {table} (queue_name, company_id, status, attempts, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            logger.info("Queue %s: enqueued %d companies", self.queue_name, len(rows))
+        return len(rows)
+
+    def lease(self, worker_id, count=1):
+        """
+        取得租約 Lease up to count companies
+
+        Args:
+            worker_id (str): 租約持有者 Lease owner
+            count (int): 最多取得數量 Maximum items
+
+        Returns:
+            list: 取得的股票代碼 Leased company IDs
+        """
+        now = time.time()
+        # 逾期租約已用完次數（例如worker反覆崩潰）則標記失敗，不再重新租出
+        # An expired lease with no attempts left (e.g. the company keeps killing its worker) becomes failed
+        exhausted = self._execute(
+            "UPDATE {table} SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+            "WHERE queue_name = ? AND status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, "lease expired after max attempts", now, self.queue_name, LEASED, now, self.max_attempts),
+        )
+        if exhausted:
+            logger.warning("Marked %d companies failed after their leases expired %d times",
+                           exhausted, self.max_attempts)
+
+        candidates = [row[0] for row in self._query(
+            "SELECT company_id FROM {table} WHERE queue_name = ? AND "
+            "(status = ? OR (status = ? AND lease_expires < ? AND attempts < ?)) ORDER BY company_id",
+            (self.queue_name, PENDING, LEASED, now, self.max_attempts),
+        )]
+        if self.shard:
+            # 自己的分片排前面，降低節點間搶同一筆的機率 Own shard first to reduce contention
+            index, total = self.shard
+            candidates.sort(key=lambda company_id: zlib.crc32(company_id.encode()) % total != index)
+
+        leased = []
+        for company_id in candidates:
+            if len(leased) >= count:
+                break
+            updated = self._execute(
+                "UPDATE {table} SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE queue_name = ? AND company_id = ? AND "
+                "(status = ? OR (status = ? AND lease_expires < ? AND attempts < ?))",
+                (LEASED, worker_id, now + self.visibility_timeout, now, self.queue_name, company_id,
+                 PENDING, LEASED, now, self.max_attempts),
+            )
+            if updated == 1:
+                leased.append(company_id)
+        return leased
+
+    def extend(self, company_ids, worker_id):
+        """
+        延長自己持有的租約 Extend leases still held by this worker
+        """
+        now = time.time()
+        self._executemany(
+            "UPDATE {table} SET lease_expires = ?, updated_at = ? "
+            "WHERE queue_name = ? AND company_id = ? AND status = ? AND lease_owner = ?",
+            [(now + self.visibility_timeout, now, self.queue_name, company_id, LEASED, worker_id)
+             for company_id in company_ids],
+        )
+
+    def complete(self, company_id, worker_id):
+        """
+        完成 Mark done; ignored if the lease was lost to another worker
+
+        Returns:
+            bool: 仍持有租約並已完成 Whether this worker still held the lease
+        """
+        return self._execute(
+            "UPDATE {table} SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = NULL, "
+            "updated_at = ? WHERE queue_name = ? AND company_id = ? AND status = ? AND lease_owner = ?",
+            (DONE, time.time(), self.queue_name, company_id, LEASED, worker_id),
+        ) == 1
+
+    def fail(self, company_id, worker_id, error, retry=True):
+        """
+        失敗，未達上限則放回佇列 Record a failure; requeued until max_attempts
+
+        Args:
+            retry (bool): False則直接標記失敗（例如代碼無效） Mark failed immediately, e.g. invalid ID
+        """
+        rows = self._query(
+            "SELECT attempts FROM {table} WHERE queue_name = ? AND company_id = ?",
+            (self.queue_name, company_id),
+        )
+        attempts = rows[0][0] if rows else self.max_attempts
+        status = PENDING if retry and attempts < self.max_attempts else FAILED
+        return self._execute(
+            "UPDATE {table} SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, "
+            "updated_at = ? WHERE queue_name = ? AND company_id = ? AND status = ? AND lease_owner = ?",
+            (status, str(error)[:512], time.time(), self.queue_name, company_id, LEASED, worker_id),
+        ) == 1
+
+    def retry_failed(self):
+        """
+        把失敗的項目放回佇列並重設次數 Requeue failed items with a fresh attempt count
+        """
+        return self._execute(
+            "UPDATE {table} SET status = ?, attempts = 0, updated_at = ? WHERE queue_name = ? AND status = ?",
+            (PENDING, time.time(), self.queue_name, FAILED),
+        )
+
+    def stats(self):
+        """
+        各狀態數量，逾期租約計入pending，已用完次數者計入failed
+        Counts per state; expired leases count as pending, or failed once out of attempts
+        """
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        now = time.time()
+        for status, expires, attempts in self._query(
+                "SELECT status, lease_expires, attempts FROM {table} WHERE queue_name = ?", (self.queue_name,)):
+            if status == LEASED and expires is not None and expires < now:
+                status = PENDING if attempts < self.max_attempts else FAILED
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def _sql(self, sql):
+        """
+        轉換為驅動的參數樣式 Rewrite ? placeholders for the driver's paramstyle
+        """
+        sql = sql.replace("{table}", self.table)
+        if self.paramstyle == "qmark":
+            return sql
+        parts = sql.split("?")
+        if self.paramstyle in ("format", "pyformat"):
+            return "%s".join(parts)
+        if self.paramstyle == "numeric":
+            return "".join(part + (f":{index + 1}" if index < len(parts) - 1 else "")
+                           for index, part in enumerate(parts))
+        raise ValueError(f"Unsupported paramstyle: {self.paramstyle}")
+
+    def _query(self, sql, params):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(self._sql(sql), params)
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        finally:
+            cursor.close()
+
+    def _execute(self, sql, params):
+        """
+        執行並提交，回傳影響列數 Execute and commit; returns the row count
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(self._sql(sql), params)
+            self.connection.commit()
+            return cursor.rowcount
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _executemany(self, sql, rows):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(self._sql(sql), rows)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()